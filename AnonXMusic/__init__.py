@@ -18,9 +18,19 @@ userbot = Userbot()
 from .platforms import *
 
 Apple = AppleAPI()
-Carbon = CarbonAPI()
 SoundCloud = SoundAPI()
 Spotify = SpotifyAPI()
 Resso = RessoAPI()
 Telegram = TeleAPI()
 YouTube = YouTubeAPI()
+
+
+def __getattr__(name):
+    # Carbon is only needed for long queue lists, build it on first use.
+    global Carbon
+    if name == "Carbon":
+        from .platforms.Carbon import CarbonAPI
+
+        Carbon = CarbonAPI()
+        return Carbon
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,52 +1,46 @@
 import asyncio
-import importlib
 
 from pyrogram import idle
 from pytgcalls.exceptions import NoActiveGroupCall
 
 import config
 from AnonXMusic import LOGGER, app, userbot
+from AnonXMusic.core.cache import media_cache
 from AnonXMusic.core.call import Anony
+from AnonXMusic.core.flags import flags
+from AnonXMusic.core.httpclient import http_client
+from AnonXMusic.core.startup import Startup
 from AnonXMusic.misc import sudo
-from AnonXMusic.plugins import ALL_MODULES
-from AnonXMusic.utils.database import get_banned_users, get_gbanned
+from AnonXMusic.plugins import load_plugins, start_background_tasks
+from AnonXMusic.utils.database import (
+    get_banned_users,
+    get_gbanned,
+    preload_chat_settings,
+)
+from AnonXMusic.utils.stream.persist import (
+    get_saved_queue_chats,
+    queue_snapshotter,
+    restore_queues,
+    save_queues,
+)
+from AnonXMusic.utils.stream.updater import updater
 from config import BANNED_USERS
 
 
-async def init():
-    if (
-        not config.STRING1
-        and not config.STRING2
-        and not config.STRING3
-        and not config.STRING4
-        and not config.STRING5
-    ):
-        LOGGER(__name__).error("Assistant client variables not defined. Exiting.")
-        exit()
-
-    await sudo()
-
+async def load_banned_users():
     try:
-        users = await get_gbanned()
-        for user_id in users:
-            BANNED_USERS.add(user_id)
-
-        users = await get_banned_users()
-        for user_id in users:
+        users = await asyncio.gather(get_gbanned(), get_banned_users())
+        for user_id in users[0] + users[1]:
             BANNED_USERS.add(user_id)
     except:
         pass
 
-    await app.start()
 
-    for module in ALL_MODULES:
-        importlib.import_module("AnonXMusic.plugins" + module)
+async def preload_settings():
+    await preload_chat_settings(await get_saved_queue_chats())
 
-    LOGGER("AnonXMusic.plugins").info("Modules imported successfully.")
-
-    await userbot.start()
-    await Anony.start()
 
+async def probe_call():
     try:
         await Anony.stream_call("https://te.legra.ph/file/29f784eb49d230ab62e9e.mp4")
     except NoActiveGroupCall:
@@ -57,13 +51,41 @@ async def init():
     except:
         pass
 
+
+async def init():
+    if not config.STRING_SESSIONS:
+        LOGGER(__name__).error("Assistant client variables not defined. Exiting.")
+        exit()
+
+    startup = Startup()
+    asyncio.create_task(flags.watch())
+    # Nothing in here depends on each other, mongo and telegram logins overlap.
+    await startup.stage(
+        "boot",
+        sudo=sudo(),
+        banned=load_banned_users(),
+        settings=preload_settings(),
+        app=app.start(),
+        assistants=userbot.start(),
+        pytgcalls=Anony.start(),
+    )
+    await startup.stage("plugins", plugins=load_plugins(app))
+    await startup.stage("probe", probe=probe_call())
     await Anony.decorators()
+    await startup.stage("queues", restore=restore_queues())
+    media_cache.sweep()
+    asyncio.create_task(queue_snapshotter())
+    asyncio.create_task(updater.run())
+    start_background_tasks()
 
+    startup.report()
     LOGGER("AnonXMusic").info("AnonX Music Bot Started Successfully.")
 
     await idle()
+    await save_queues(force=True)
     await app.stop()
     await userbot.stop()
+    await http_client.close()
     LOGGER("AnonXMusic").info("Bot Stopped.")
 
 
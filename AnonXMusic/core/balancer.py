@@ -0,0 +1,110 @@
+import time
+from collections import Counter
+from typing import Dict, Iterable, List
+
+import config
+
+
+def _parse_capacity(value: str) -> Dict[int, float]:
+    capacity = {}
+    for i, weight in enumerate(str(value or "").split(","), start=1):
+        try:
+            capacity[i] = max(0.1, float(weight))
+        except ValueError:
+            continue
+    return capacity
+
+
+class AssistantBalancer:
+    """Picks the assistant with the fewest live calls relative to its capacity."""
+
+    def __init__(self):
+        self.capacity = _parse_capacity(config.ASSISTANT_CAPACITY)
+        self.max_failures = config.ASSISTANT_MAX_FAILURES
+        self.cooldown = config.ASSISTANT_COOLDOWN
+        self.margin = config.ASSISTANT_REBALANCE_MARGIN
+        self.failures: Dict[int, int] = {}
+        self.failed_at: Dict[int, float] = {}
+
+    def weight(self, assistant: int) -> float:
+        return self.capacity.get(int(assistant), 1.0)
+
+    def healthy(self, assistant: int) -> bool:
+        if self.failures.get(assistant, 0) < self.max_failures:
+            return True
+        # Give it another chance once the cooldown is over.
+        return time.monotonic() - self.failed_at.get(assistant, 0) > self.cooldown
+
+    def report(self, assistant: int, ok: bool):
+        if assistant is None:
+            return
+        assistant = int(assistant)
+        if ok:
+            self.failures.pop(assistant, None)
+            self.failed_at.pop(assistant, None)
+        else:
+            self.failures[assistant] = self.failures.get(assistant, 0) + 1
+            self.failed_at[assistant] = time.monotonic()
+
+    @staticmethod
+    def calls(assignments: dict, active: Iterable[int]) -> Counter:
+        return Counter(assignments[x] for x in active if x in assignments)
+
+    def _score(self, assistant: int, calls: Counter, chats: Counter) -> tuple:
+        weight = self.weight(assistant)
+        return (
+            not self.healthy(assistant),
+            calls[assistant] / weight,
+            chats[assistant] / weight,
+            assistant,
+        )
+
+    def pick(
+        self, assistants: List[int], assignments: dict, active: Iterable[int]
+    ) -> int:
+        calls = self.calls(assignments, active)
+        chats = Counter(assignments.values())
+        return min(assistants, key=lambda x: self._score(x, calls, chats))
+
+    def should_move(
+        self,
+        chat_id: int,
+        assistants: List[int],
+        assignments: dict,
+        active: Iterable[int],
+    ) -> bool:
+        # Only called for chats without a running call, moving them is free.
+        current = assignments.get(chat_id)
+        if current not in assistants or len(assistants) < 2:
+            return current not in assistants
+        calls = self.calls(assignments, active)
+        best = min(
+            assistants, key=lambda x: self._score(x, calls, Counter())[:2]
+        )
+        if best == current:
+            return False
+        if not self.healthy(current):
+            return self.healthy(best)
+        load = calls[current] / self.weight(current)
+        return load - calls[best] / self.weight(best) > self.margin
+
+    def stats(
+        self, assistants: List[int], assignments: dict, active: Iterable[int]
+    ) -> List[dict]:
+        calls = self.calls(assignments, active)
+        chats = Counter(assignments.values())
+        return [
+            {
+                "assistant": x,
+                "calls": calls[x],
+                "chats": chats[x],
+                "capacity": self.weight(x),
+                "load": calls[x] / self.weight(x),
+                "healthy": self.healthy(x),
+                "failures": self.failures.get(x, 0),
+            }
+            for x in assistants
+        ]
+
+
+balancer = AssistantBalancer()
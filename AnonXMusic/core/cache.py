@@ -0,0 +1,226 @@
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Optional
+
+import config
+
+from ..logging import LOGGER
+
+INDEX_FILE = ".index.json"
+SAVE_DELAY = 5
+# Files touched this recently are about to be streamed, never evict them
+GRACE_PERIOD = 600
+
+
+class MediaCache:
+    def __init__(
+        self,
+        folder: str = "downloads",
+        limit: int = config.CACHE_SIZE_LIMIT,
+        policy: str = config.CACHE_EVICTION_POLICY,
+        name: str = "Media cache",
+    ):
+        self.folder = folder
+        self.name = name
+        self.limit = limit
+        self.policy = str(policy).lower()
+        self.index: Dict[str, dict] = {}
+        self.paths: Dict[str, str] = {}
+        self.pins: Dict[str, int] = {}
+        self.total = 0
+        self._loaded = False
+        self._save_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def key(video_id: str, mode: str = "audio") -> str:
+        return f"{video_id}:{mode}"
+
+    def _index_path(self) -> str:
+        return os.path.join(self.folder, INDEX_FILE)
+
+    def load(self, sweep: bool = True):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except Exception:
+            entries = {}
+        for key, entry in entries.items():
+            path = entry.get("path")
+            if not path or not os.path.isfile(path):
+                continue
+            entry["size"] = os.path.getsize(path)
+            self.index[key] = entry
+            self.paths[path] = key
+            self.total += entry["size"]
+        if sweep:
+            self.sweep()
+        LOGGER(__name__).info(
+            f"{self.name} loaded: {len(self.index)} files, {self.total // (1024 * 1024)} MB."
+        )
+
+    def sweep(self):
+        # Anything left over from a previous run which isn't indexed (partial
+        # downloads, telegram files) is stale by now, unless a queue uses it.
+        if not os.path.isdir(self.folder):
+            return
+        pinned = self._pinned()
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            if name == INDEX_FILE or path in self.paths or not os.path.isfile(path):
+                continue
+            if os.path.realpath(path) in pinned:
+                continue
+            try:
+                os.remove(path)
+            except Exception:
+                pass
+
+    def _save(self):
+        os.makedirs(self.folder, exist_ok=True)
+        tmp = self._index_path() + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.index, f)
+            os.replace(tmp, self._index_path())
+        except Exception as e:
+            LOGGER(__name__).warning(f"Failed to save {self.name.lower()} index: {e}")
+
+    async def _delayed_save(self):
+        await asyncio.sleep(SAVE_DELAY)
+        self._save_task = None
+        self._save()
+
+    def _schedule_save(self):
+        if self._save_task and not self._save_task.done():
+            return
+        try:
+            self._save_task = asyncio.get_running_loop().create_task(
+                self._delayed_save()
+            )
+        except RuntimeError:
+            self._save()
+
+    def get(self, video_id: str, mode: str = "audio") -> Optional[str]:
+        self.load()
+        key = self.key(video_id, mode)
+        entry = self.index.get(key)
+        if not entry:
+            return None
+        path = entry["path"]
+        if not os.path.isfile(path) or os.path.getsize(path) == 0:
+            self._drop(key)
+            self._schedule_save()
+            return None
+        entry["atime"] = time.time()
+        entry["hits"] = entry.get("hits", 0) + 1
+        self._schedule_save()
+        return path
+
+    def add(self, video_id: str, mode: str, path: str) -> str:
+        self.load()
+        if not path or not os.path.isfile(path):
+            return path
+        key = self.key(video_id, mode)
+        if key in self.index:
+            self._drop(key, remove=self.index[key]["path"] != path)
+        size = os.path.getsize(path)
+        self.index[key] = {
+            "path": path,
+            "size": size,
+            "atime": time.time(),
+            "hits": 1,
+        }
+        self.paths[path] = key
+        self.total += size
+        self.evict()
+        self._schedule_save()
+        return path
+
+    def _drop(self, key: str, remove: bool = False):
+        entry = self.index.pop(key, None)
+        if not entry:
+            return
+        self.paths.pop(entry["path"], None)
+        self.total -= entry.get("size", 0)
+        if remove:
+            try:
+                os.remove(entry["path"])
+            except Exception:
+                pass
+
+    def is_cached(self, path: str) -> bool:
+        self.load()
+        return path in self.paths
+
+    def pin(self, path: str):
+        if path:
+            self.pins[path] = self.pins.get(path, 0) + 1
+
+    def unpin(self, path: str):
+        count = self.pins.get(path, 0) - 1
+        if count > 0:
+            self.pins[path] = count
+        else:
+            self.pins.pop(path, None)
+
+    def _pinned(self) -> set:
+        """Real paths of the files pinned or used by a queue.
+
+        Queues hold relative download paths as well as absolute telegram ones."""
+        from AnonXMusic.misc import db
+
+        pinned = set(self.pins)
+        for queue in list(db.values()):
+            for item in queue or []:
+                pinned.add(str(item.get("file")))
+                for mode in ("audio", "video"):
+                    entry = self.index.get(self.key(item.get("vidid"), mode))
+                    if entry:
+                        pinned.add(entry["path"])
+        return {os.path.realpath(path) for path in pinned}
+
+    def _score(self, entry: dict):
+        if self.policy == "lfu":
+            return entry.get("hits", 0), entry.get("atime", 0)
+        return entry.get("atime", 0)
+
+    def evict(self) -> int:
+        if self.limit <= 0 or self.total <= self.limit:
+            return 0
+        pinned = self._pinned()
+        fresh = time.time() - GRACE_PERIOD
+        candidates = sorted(
+            (self._score(entry), key)
+            for key, entry in self.index.items()
+            if os.path.realpath(entry["path"]) not in pinned
+            and entry.get("atime", 0) < fresh
+        )
+        freed = 0
+        for _, key in candidates:
+            if self.total <= self.limit:
+                break
+            freed += self.index[key].get("size", 0)
+            self._drop(key, remove=True)
+        if freed:
+            LOGGER(__name__).info(
+                f"{self.name} evicted {freed // (1024 * 1024)} MB, {self.total // (1024 * 1024)} MB in use."
+            )
+        return freed
+
+    def stats(self) -> dict:
+        self.load()
+        return {
+            "files": len(self.index),
+            "size": self.total,
+            "limit": self.limit,
+            "pinned": len(self.pins),
+            "policy": self.policy,
+        }
+
+
+media_cache = MediaCache()
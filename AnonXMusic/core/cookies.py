@@ -1,18 +1,20 @@
+import asyncio
 import os
-import aiohttp
 import aiofiles
+import httpx
 
 from AnonXMusic import app
 import config
 from ..logging import LOGGER
+from .httpclient import http_client
 
 
-async def fetch_content(session: aiohttp.ClientSession, url: str):
+async def fetch_content(url: str):
     try:
-        async with session.get(url) as response:
-            response.raise_for_status()
-            return await response.read()
-    except aiohttp.ClientError as e:
+        response = await http_client.get(url)
+        response.raise_for_status()
+        return response.content
+    except httpx.HTTPError as e:
         LOGGER(__name__).error(f"Error fetching from {url}: {e}")
         return b""
 
@@ -45,24 +47,23 @@ def is_malformed_or_cloned(path: str) -> bool:
 
 
 async def download_and_validate(url: str, file_path: str) -> bool:
-    async with aiohttp.ClientSession() as session:
-        content = await fetch_content(session, url)
+    content = await fetch_content(url)
 
-        if not content:
-            LOGGER(__name__).error("No content fetched from cookies URL Or Url Isnt Assigned In Config py.")
-            return False
+    if not content:
+        LOGGER(__name__).error("No content fetched from cookies URL Or Url Isnt Assigned In Config py.")
+        return False
 
-        saved_path = await save_file(content, file_path)
-        if saved_path and os.path.getsize(saved_path) > 0:
-            if is_malformed_or_cloned(saved_path):
-                os.remove(saved_path)
-                LOGGER(__name__).error("Downloaded cookies.txt is malformed or cloned. Deleted.")
-                return False
-            LOGGER(__name__).info(f"Cookies saved successfully to {saved_path}.")
-            return True
+    saved_path = await save_file(content, file_path)
+    if saved_path and os.path.getsize(saved_path) > 0:
+        if is_malformed_or_cloned(saved_path):
+            os.remove(saved_path)
+            LOGGER(__name__).error("Downloaded cookies.txt is malformed or cloned. Deleted.")
+            return False
+        LOGGER(__name__).info(f"Cookies saved successfully to {saved_path}.")
+        return True
 
-        LOGGER(__name__).error("Failed to save cookies or the file is empty.")
-        return False
+    LOGGER(__name__).error("Failed to save cookies or the file is empty.")
+    return False
 
 
 async def save_cookies():
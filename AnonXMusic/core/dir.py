@@ -1,6 +1,7 @@
 import os
 
 from ..logging import LOGGER
+from .cache import media_cache
 
 
 def dirr():
@@ -17,4 +18,7 @@ def dirr():
     if "cache" not in os.listdir():
         os.mkdir("cache")
 
+    # Swept once saved queues are restored, those may still use leftovers.
+    media_cache.load(sweep=False)
+
     LOGGER(__name__).info("Directories Updated.")
@@ -0,0 +1,135 @@
+import asyncio
+import multiprocessing
+import time
+from collections import deque
+from typing import Any, Callable, Optional
+
+import config
+import ytdlp_jobs
+
+from ..logging import LOGGER
+
+
+class ExtractionError(Exception):
+    pass
+
+
+def _reap(process):
+    process.join(5)
+    if process.is_alive():
+        process.kill()
+        process.join()
+
+
+class ExtractorPool:
+    """Runs yt-dlp jobs in worker processes, at most EXTRACT_WORKERS at once.
+
+    Workers come from a forkserver that only has yt-dlp loaded, never from the
+    bot itself, so jobs must be functions of the top-level ytdlp_jobs module.
+    Unlike a thread, a worker that overruns its timeout (or whose caller is
+    cancelled) is killed instead of being left running in the background."""
+
+    def __init__(self):
+        self.workers = max(1, config.EXTRACT_WORKERS)
+        self.context = multiprocessing.get_context("forkserver")
+        # The process has one forkserver, it serves the thumbnail workers too.
+        self.context.set_forkserver_preload(["ytdlp_jobs", "yt_dlp", "thumb_jobs"])
+        self.semaphore = asyncio.Semaphore(self.workers)
+        self.queued = 0
+        self.running = 0
+        self.done = 0
+        self.failed = 0
+        self.killed = 0
+        self.last_ms = 0.0
+        self.avg_ms = 0.0
+        self.wait_ms = 0.0
+        self.recent = deque(maxlen=20)
+
+    async def _receive(self, reader) -> Any:
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        # Readable once the worker sent its result or died (EOF).
+        loop.add_reader(
+            reader.fileno(), lambda: ready.done() or ready.set_result(None)
+        )
+        try:
+            await ready
+        finally:
+            loop.remove_reader(reader.fileno())
+        try:
+            ok, result = reader.recv()
+        except EOFError:
+            raise ExtractionError("Extraction worker died")
+        if not ok:
+            raise ExtractionError(result)
+        return result
+
+    async def run(
+        self, func: Callable, *args, timeout: Optional[float] = None, name: str = ""
+    ) -> Any:
+        name = name or func.__name__
+        queued_at = time.perf_counter()
+        self.queued += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.queued -= 1
+        start = time.perf_counter()
+        self.wait_ms = (start - queued_at) * 1000
+        self.running += 1
+        status = "failed"
+        reader, writer = self.context.Pipe(duplex=False)
+        process = self.context.Process(
+            target=ytdlp_jobs.run_job, args=(writer, func, args), daemon=True
+        )
+        try:
+            process.start()
+            writer.close()
+            result = await asyncio.wait_for(
+                self._receive(reader), timeout or config.EXTRACT_TIMEOUT
+            )
+            status = "done"
+            return result
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            status = "killed"
+            raise
+        finally:
+            if status != "done" and process.is_alive():
+                process.kill()
+            writer.close()
+            reader.close()
+            if process.pid is not None:
+                asyncio.get_running_loop().run_in_executor(None, _reap, process)
+            self.running -= 1
+            self.semaphore.release()
+            self._record(name, status, start)
+
+    def _record(self, name: str, status: str, start: float):
+        took = (time.perf_counter() - start) * 1000
+        if status == "done":
+            self.done += 1
+            self.last_ms = took
+            self.avg_ms = took if self.done == 1 else self.avg_ms * 0.9 + took * 0.1
+        elif status == "killed":
+            self.killed += 1
+            LOGGER(__name__).warning(f"Killed extraction {name} after {took:.0f}ms.")
+        else:
+            self.failed += 1
+        self.recent.append((name, status, round(took)))
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued": self.queued,
+            "running": self.running,
+            "done": self.done,
+            "failed": self.failed,
+            "killed": self.killed,
+            "last_ms": round(self.last_ms, 1),
+            "avg_ms": round(self.avg_ms, 1),
+            "wait_ms": round(self.wait_ms, 1),
+            "recent": list(self.recent),
+        }
+
+
+extractor = ExtractorPool()
@@ -0,0 +1,69 @@
+import asyncio
+from typing import Optional, Set
+
+from pymongo.errors import PyMongoError
+
+import config
+
+from ..logging import LOGGER
+from .mongo import mongodb
+
+onoffdb = mongodb.onoffper
+
+
+class GlobalFlags:
+    """In-memory copy of the on/off flags, kept in sync with the database."""
+
+    def __init__(self):
+        self.flags: Set[int] = set()
+        self._loaded: Optional[asyncio.Future] = None
+
+    async def load(self):
+        self.flags = {doc["on_off"] async for doc in onoffdb.find({})}
+
+    async def _ensure_loaded(self):
+        if self._loaded is None:
+            self._loaded = asyncio.ensure_future(self.load())
+        try:
+            await asyncio.shield(self._loaded)
+        except Exception:
+            self._loaded = None
+            raise
+
+    async def get(self, flag: int) -> bool:
+        await self._ensure_loaded()
+        return flag in self.flags
+
+    async def set(self, flag: int, value: bool):
+        await self._ensure_loaded()
+        if value:
+            self.flags.add(flag)
+            await onoffdb.update_one(
+                {"on_off": flag}, {"$set": {"on_off": flag}}, upsert=True
+            )
+        else:
+            self.flags.discard(flag)
+            await onoffdb.delete_many({"on_off": flag})
+
+    async def _poll(self):
+        while not await asyncio.sleep(config.FLAGS_POLL_INTERVAL):
+            try:
+                await self.load()
+            except PyMongoError as e:
+                LOGGER(__name__).warning(f"Failed to refresh flags: {e}")
+
+    async def watch(self):
+        # Another instance (or a manual edit) may flip a flag, follow the
+        # collection's change stream; standalone servers don't have one.
+        await self._ensure_loaded()
+        try:
+            async with onoffdb.watch() as stream:
+                LOGGER(__name__).info("Watching flags via change stream.")
+                async for _ in stream:
+                    await self.load()
+        except PyMongoError:
+            LOGGER(__name__).info("Change streams unavailable, polling flags.")
+            await self._poll()
+
+
+flags = GlobalFlags()
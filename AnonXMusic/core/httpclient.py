@@ -0,0 +1,70 @@
+import asyncio
+from typing import Optional
+
+import httpx
+
+import config
+
+from ..logging import LOGGER
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+
+class HttpClient:
+    """Process wide httpx client, connections are pooled and kept alive per host.
+
+    The pool belongs to the loop that first used it, close() it before using
+    the client from another loop."""
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _build(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=HTTP2,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=config.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(config.HTTP_TIMEOUT),
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._loop is not None and self._loop is not loop:
+            raise RuntimeError("HTTP client is bound to another event loop, close() it first.")
+        if self._client is None or self._client.is_closed:
+            self._client = self._build()
+            self._loop = loop
+            LOGGER(__name__).info(f"HTTP client pool created (http2={HTTP2}).")
+        return self._client
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.client.get(url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.client.post(url, **kwargs)
+
+    async def head(self, url: str, **kwargs) -> httpx.Response:
+        return await self.client.head(url, **kwargs)
+
+    def stream(self, method: str, url: str, **kwargs):
+        return self.client.stream(method, url, **kwargs)
+
+    async def close(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+
+http_client = HttpClient()
@@ -0,0 +1,40 @@
+import asyncio
+import time
+from typing import Awaitable, List, Tuple
+
+from ..logging import LOGGER
+
+
+class Startup:
+    """Runs startup in stages, steps inside a stage run concurrently."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings: List[Tuple[str, float, List[Tuple[str, float]]]] = []
+
+    async def _step(self, name: str, aw: Awaitable, timings: list):
+        start = time.perf_counter()
+        try:
+            return await aw
+        finally:
+            timings.append((name, time.perf_counter() - start))
+
+    async def stage(self, name: str, **steps: Awaitable) -> list:
+        start = time.perf_counter()
+        timings = []
+        try:
+            return await asyncio.gather(
+                *(self._step(step, aw, timings) for step, aw in steps.items())
+            )
+        finally:
+            self.timings.append((name, time.perf_counter() - start, timings))
+
+    def report(self):
+        lines = []
+        for name, took, steps in self.timings:
+            lines.append(f"{name}: {took * 1000:.0f}ms")
+            for step, step_took in sorted(steps, key=lambda x: -x[1]):
+                lines.append(f"  {step}: {step_took * 1000:.0f}ms")
+        total = time.perf_counter() - self.started
+        lines.append(f"total: {total * 1000:.0f}ms")
+        LOGGER(__name__).info("Startup timings:\n" + "\n".join(lines))
@@ -1,11 +1,25 @@
 import re
 import json
-from typing import Union
-from urllib.parse import urlparse, unquote
+from typing import Optional, Union
+from urllib.parse import parse_qs, urlparse, unquote
 
-import aiohttp
 from bs4 import BeautifulSoup
-from youtubesearchpython.future import VideosSearch
+
+from AnonXMusic.core.httpclient import http_client
+from AnonXMusic.utils.matches import TrackRef, match_from_result, match_index, track_details
+from AnonXMusic.utils.search import search_cache
+
+
+def _track_id(url: str) -> Optional[str]:
+    """Apple's numeric song id, from ?i= on album links or the /song/ path."""
+    parsed = urlparse(url)
+    song = parse_qs(parsed.query).get("i")
+    if song and song[0].isdigit():
+        return song[0]
+    last = [p for p in parsed.path.split("/") if p][-1:]
+    if "/song/" in parsed.path and last and last[0].isdigit():
+        return last[0]
+    return None
 
 
 class AppleAPI:
@@ -27,20 +41,17 @@ class AppleAPI:
     async def _fetch(self, url: str):
         """Fetch page HTML with friendly headers. Returns text or False on failure."""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=self.headers, allow_redirects=True, timeout=15) as resp:
-                    if resp.status != 200:
-                        return False
-                    return await resp.text()
+            resp = await http_client.get(url, headers=self.headers, timeout=15)
+            if resp.status_code != 200:
+                return False
+            return resp.text
         except Exception:
             return False
 
     async def _yt_search(self, query: str):
         """Return list of YouTube search results (may be empty)."""
         try:
-            vs = VideosSearch(query, limit=1)
-            out = await vs.next()
-            return out.get("result", []) if isinstance(out, dict) else []
+            return await search_cache.search(query)
         except Exception:
             return []
 
@@ -48,6 +59,12 @@ class AppleAPI:
         if playid:
             url = self.base + url
 
+        track_id = _track_id(url)
+        if track_id:
+            match = await match_index.get(TrackRef("apple", track_id, ""))
+            if match:
+                return track_details(match), match["vidid"]
+
         html = await self._fetch(url)
         if not html:
             return False
@@ -57,6 +74,7 @@ class AppleAPI:
         # 1) Try JSON-LD (best shot)
         track_name = None
         artist_name = None
+        isrc = None
         for script in soup.find_all("script", {"type": "application/ld+json"}):
             try:
                 payload = json.loads(script.string or script.text)
@@ -73,6 +91,7 @@ class AppleAPI:
                     # name
                     if not track_name:
                         track_name = item.get("name") or item.get("headline") or track_name
+                    isrc = isrc or item.get("isrcCode")
                     # artist - can be dict or list or string
                     by = item.get("byArtist") or item.get("author") or item.get("artist")
                     if by:
@@ -160,14 +179,18 @@ class AppleAPI:
             return False
 
         d = yt_results[0]
-        track_details = {
+        if track_id and d.get("id"):
+            match = match_from_result(d, track_name)
+            await match_index.save(TrackRef("apple", track_id, search_query, isrc), match)
+            return track_details(match), match["vidid"]
+        details = {
             "title": d.get("title"),
             "link": d.get("link"),
             "vidid": d.get("id"),
             "duration_min": d.get("duration"),
             "thumb": (d.get("thumbnails") or [{"url": None}])[0].get("url", "").split("?")[0],
         }
-        return track_details, d.get("id")
+        return details, d.get("id")
 
     async def playlist(self, url, playid: Union[bool, str] = None):
         if playid:
@@ -1,9 +1,11 @@
 import re
 from typing import Union
 
-import aiohttp
 from bs4 import BeautifulSoup
-from youtubesearchpython.future import VideosSearch
+
+from AnonXMusic.core.httpclient import http_client
+from AnonXMusic.utils.matches import TrackRef, match_from_result, match_index, track_details
+from AnonXMusic.utils.search import search_cache
 
 
 class RessoAPI:
@@ -20,11 +22,14 @@ class RessoAPI:
     async def track(self, url, playid: Union[bool, str] = None):
         if playid:
             url = self.base + url
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    return False
-                html = await response.text()
+        track_id = url.split("resso.com/", 1)[-1].split("?")[0].strip("/")
+        match = await match_index.get(TrackRef("resso", track_id, ""))
+        if match:
+            return track_details(match), match["vidid"]
+        response = await http_client.get(url)
+        if response.status_code != 200:
+            return False
+        html = response.text
         soup = BeautifulSoup(html, "html.parser")
         for tag in soup.find_all("meta"):
             if tag.get("property", None) == "og:title":
@@ -37,18 +42,9 @@ class RessoAPI:
                     pass
         if des == "":
             return
-        results = VideosSearch(title, limit=1)
-        for result in (await results.next())["result"]:
-            title = result["title"]
-            ytlink = result["link"]
-            vidid = result["id"]
-            duration_min = result["duration"]
-            thumbnail = result["thumbnails"][0]["url"].split("?")[0]
-        track_details = {
-            "title": title,
-            "link": ytlink,
-            "vidid": vidid,
-            "duration_min": duration_min,
-            "thumb": thumbnail,
-        }
-        return track_details, vidid
+        result = await search_cache.first(title)
+        if not result.get("id"):
+            return False
+        match = match_from_result(result, title)
+        await match_index.save(TrackRef("resso", track_id, title), match)
+        return track_details(match), match["vidid"]
@@ -1,8 +1,12 @@
 from os import path
 
-from yt_dlp import YoutubeDL
+import ytdlp_jobs
 
+from AnonXMusic.core.extractor import extractor
 from AnonXMusic.utils.formatters import seconds_to_min
+from AnonXMusic.utils.singleflight import SingleFlight
+
+inflight = SingleFlight()
 
 
 class SoundAPI:
@@ -22,10 +26,14 @@ class SoundAPI:
             return False
 
     async def download(self, url):
-        d = YoutubeDL(self.opts)
+        return await inflight.do(("soundcloud", url), self._download, url)
+
+    async def _download(self, url):
         try:
-            info = d.extract_info(url)
-        except:
+            info = await extractor.run(
+                ytdlp_jobs.soundcloud, url, self.opts, name=f"soundcloud {url}"
+            )
+        except Exception:
             return False
         xyz = path.join("downloads", f"{info['id']}.{info['ext']}")
         duration_min = seconds_to_min(info["duration"])
@@ -1,10 +1,41 @@
+import asyncio
+import base64
 import re
+import time
+from typing import List, Optional
 
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
-from youtubesearchpython.future import VideosSearch
+from cachetools import TTLCache
 
 import config
+from AnonXMusic.core.httpclient import http_client
+from AnonXMusic.utils.matches import TrackRef, match_index, track_details
+from AnonXMusic.utils.singleflight import SingleFlight
+
+API = "https://api.spotify.com/v1"
+TOKEN_URL = "https://accounts.spotify.com/api/token"
+SPOTIFY_ID = re.compile(
+    r"(?:open\.spotify\.com/(?:intl-[\w-]+/)?(?:track|playlist|album|artist)/|spotify:\w+:)?([0-9A-Za-z]{22})"
+)
+
+
+class SpotifyError(Exception):
+    pass
+
+
+def _query(track: dict) -> str:
+    info = track["name"]
+    for artist in track["artists"]:
+        fetched = f' {artist["name"]}'
+        if "Various Artists" not in fetched:
+            info += fetched
+    return info
+
+
+def _ref(track: dict):
+    if not track.get("id"):
+        return _query(track)
+    isrc = (track.get("external_ids") or {}).get("isrc")
+    return TrackRef("spotify", track["id"], _query(track), isrc)
 
 
 class SpotifyAPI:
@@ -12,15 +43,11 @@ class SpotifyAPI:
         self.regex = r"^(https:\/\/open.spotify.com\/)(.*)$"
         self.client_id = config.SPOTIFY_CLIENT_ID
         self.client_secret = config.SPOTIFY_CLIENT_SECRET
-        if config.SPOTIFY_CLIENT_ID and config.SPOTIFY_CLIENT_SECRET:
-            self.client_credentials_manager = SpotifyClientCredentials(
-                self.client_id, self.client_secret
-            )
-            self.spotify = spotipy.Spotify(
-                client_credentials_manager=self.client_credentials_manager
-            )
-        else:
-            self.spotify = None
+        self.spotify = bool(self.client_id and self.client_secret)
+        self.token: Optional[str] = None
+        self.expires = 0.0
+        self.cache = TTLCache(maxsize=2000, ttl=config.SPOTIFY_CACHE_TTL)
+        self.inflight = SingleFlight()
 
     async def valid(self, link: str):
         if re.search(self.regex, link):
@@ -28,71 +55,111 @@ class SpotifyAPI:
         else:
             return False
 
+    def _id(self, link: str) -> str:
+        match = SPOTIFY_ID.search(str(link))
+        if not match:
+            raise SpotifyError(f"Not a spotify link: {link}")
+        return match.group(1)
+
+    async def _fetch_token(self) -> str:
+        auth = base64.b64encode(
+            f"{self.client_id}:{self.client_secret}".encode()
+        ).decode()
+        response = await http_client.post(
+            TOKEN_URL,
+            data={"grant_type": "client_credentials"},
+            headers={"Authorization": f"Basic {auth}"},
+        )
+        response.raise_for_status()
+        data = response.json()
+        self.token = data["access_token"]
+        self.expires = time.monotonic() + data.get("expires_in", 3600) - 60
+        return self.token
+
+    async def _token(self, refresh: bool = False) -> str:
+        if not self.spotify:
+            raise SpotifyError("Spotify credentials are not set.")
+        if refresh or not self.token or time.monotonic() >= self.expires:
+            return await self.inflight.do("token", self._fetch_token)
+        return self.token
+
+    async def _request(self, url: str, params: Optional[dict] = None) -> dict:
+        token = await self._token()
+        for attempt in range(3):
+            response = await http_client.get(
+                url, params=params, headers={"Authorization": f"Bearer {token}"}
+            )
+            if response.status_code == 401 and attempt == 0:
+                token = await self._token(refresh=True)
+                continue
+            if response.status_code == 429:
+                retry = int(response.headers.get("Retry-After", 1))
+                await asyncio.sleep(min(retry, 10))
+                continue
+            response.raise_for_status()
+            return response.json()
+        raise SpotifyError(f"Spotify kept refusing {url}")
+
+    async def _get(self, url: str, **params) -> dict:
+        if not url.startswith("http"):
+            url = API + url
+        key = (url, tuple(sorted(params.items())))
+        data = self.cache.get(key)
+        if data is None:
+            data = await self.inflight.do(key, self._request, url, params or None)
+            self.cache[key] = data
+        return data
+
+    async def _paged(self, page: dict, limit: int) -> List[dict]:
+        """Items of a paging object, following `next` until limit is reached."""
+        items = list(page.get("items") or [])
+        while page.get("next") and len(items) < limit:
+            page = await self._get(page["next"])
+            items.extend(page.get("items") or [])
+        return items[:limit]
+
+    async def tracks(self, ids: List[str]) -> List[dict]:
+        """Full track objects, 50 per request."""
+        chunks = [ids[i : i + 50] for i in range(0, len(ids), 50)]
+        pages = await asyncio.gather(
+            *(self._get("/tracks", ids=",".join(chunk)) for chunk in chunks)
+        )
+        return [track for page in pages for track in page["tracks"] if track]
+
+    async def _refs(self, tracks: List[dict]) -> list:
+        refs = [_ref(track) for track in tracks]
+        await match_index.preload(ref for ref in refs if isinstance(ref, TrackRef))
+        return refs
+
     async def track(self, link: str):
-        track = self.spotify.track(link)
-        info = track["name"]
-        for artist in track["artists"]:
-            fetched = f' {artist["name"]}'
-            if "Various Artists" not in fetched:
-                info += fetched
-        results = VideosSearch(info, limit=1)
-        for result in (await results.next())["result"]:
-            ytlink = result["link"]
-            title = result["title"]
-            vidid = result["id"]
-            duration_min = result["duration"]
-            thumbnail = result["thumbnails"][0]["url"].split("?")[0]
-        track_details = {
-            "title": title,
-            "link": ytlink,
-            "vidid": vidid,
-            "duration_min": duration_min,
-            "thumb": thumbnail,
-        }
-        return track_details, vidid
+        track_id = self._id(link)
+        # A track matched before needs neither spotify nor a search.
+        match = await match_index.get(TrackRef("spotify", track_id, ""))
+        if not match:
+            track = await self._get(f"/tracks/{track_id}")
+            match = await match_index.resolve(_ref(track))
+        if not match:
+            raise SpotifyError(f"No results for {track['name']}")
+        return track_details(match), match["vidid"]
 
     async def playlist(self, url):
-        playlist = self.spotify.playlist(url)
-        playlist_id = playlist["id"]
-        results = []
-        for item in playlist["tracks"]["items"]:
-            music_track = item["track"]
-            info = music_track["name"]
-            for artist in music_track["artists"]:
-                fetched = f' {artist["name"]}'
-                if "Various Artists" not in fetched:
-                    info += fetched
-            results.append(info)
-        return results, playlist_id
+        playlist_id = self._id(url)
+        playlist = await self._get(
+            f"/playlists/{playlist_id}",
+            fields="id,tracks(next,items(track(id,name,external_ids,artists(name))))",
+        )
+        items = await self._paged(playlist["tracks"], config.PLAYLIST_FETCH_LIMIT)
+        tracks = [item["track"] for item in items if item.get("track")]
+        return await self._refs(tracks), playlist["id"]
 
     async def album(self, url):
-        album = self.spotify.album(url)
-        album_id = album["id"]
-        results = []
-        for item in album["tracks"]["items"]:
-            info = item["name"]
-            for artist in item["artists"]:
-                fetched = f' {artist["name"]}'
-                if "Various Artists" not in fetched:
-                    info += fetched
-            results.append(info)
-
-        return (
-            results,
-            album_id,
-        )
+        album = await self._get(f"/albums/{self._id(url)}")
+        items = await self._paged(album["tracks"], config.PLAYLIST_FETCH_LIMIT)
+        # Album items are simplified tracks, without the ISRC matches are keyed by.
+        tracks = await self.tracks([item["id"] for item in items if item.get("id")])
+        return await self._refs(tracks or items), album["id"]
 
     async def artist(self, url):
-        artistinfo = self.spotify.artist(url)
-        artist_id = artistinfo["id"]
-        results = []
-        artisttoptracks = self.spotify.artist_top_tracks(url)
-        for item in artisttoptracks["tracks"]:
-            info = item["name"]
-            for artist in item["artists"]:
-                fetched = f' {artist["name"]}'
-                if "Various Artists" not in fetched:
-                    info += fetched
-            results.append(info)
-
-        return results, artist_id
+        artist_id = self._id(url)
+        top = await self._get(f"/artists/{artist_id}/top-tracks", market="US")
+        return await self._refs(top["tracks"]), artist_id
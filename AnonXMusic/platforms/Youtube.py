@@ -3,22 +3,32 @@ import re
 import json
 import glob
 import random
-import yt_dlp
+import ytdlp_jobs
 import time
 import asyncio
 import aiofiles
 import httpx
 from typing import Union, Tuple, Optional, Dict, Any
 
+from cachetools import TLRUCache
+
+import config
 from config import API_URL
 from pyrogram.enums import MessageEntityType
 from pyrogram.types import Message
-from youtubesearchpython.future import VideosSearch, Playlist
+from youtubesearchpython.future import Playlist
+from AnonXMusic.core.cache import media_cache
+from AnonXMusic.core.extractor import extractor
+from AnonXMusic.core.httpclient import http_client
 from AnonXMusic.utils.database import is_on_off
-from AnonXMusic.utils.formatters import time_to_seconds
+from AnonXMusic.utils.formatters import seconds_to_min, time_to_seconds
+from AnonXMusic.utils.singleflight import SingleFlight
+from AnonXMusic.utils.search import search_cache
 from .. import LOGGER
 
 logger = LOGGER(__name__)
+inflight = SingleFlight()
+extracting = SingleFlight()
 
 TIMEOUT = 30
 DOWNLOAD_TIMEOUT = 60
@@ -44,6 +54,80 @@ def _api_endpoint() -> Optional[str]:
     return API_URL.rstrip("/")
 
 
+def _short_views(count: Optional[int]) -> str:
+    if not count:
+        return ""
+    for size, unit in ((10**9, "B"), (10**6, "M"), (10**3, "K")):
+        if count >= size:
+            return f"{count / size:.1f}".rstrip("0").rstrip(".") + f"{unit} views"
+    return f"{count} views"
+
+
+def _flat_result(entry: dict) -> Optional[Dict[str, Any]]:
+    """A yt-dlp flat playlist entry in the shape VideosSearch returns."""
+    vid = entry.get("id")
+    if not vid or not entry.get("title") or not entry.get("duration"):
+        return None
+    channel_url = entry.get("channel_url") or entry.get("uploader_url") or ""
+    return {
+        "id": vid,
+        "title": entry["title"],
+        "duration": seconds_to_min(entry["duration"]),
+        "thumbnails": [{"url": f"https://i.ytimg.com/vi/{vid}/hqdefault.jpg"}],
+        "viewCount": {"short": _short_views(entry.get("view_count"))},
+        "channel": {
+            "name": entry.get("channel") or entry.get("uploader") or "",
+            "link": channel_url,
+        },
+        "link": f"https://www.youtube.com/watch?v={vid}",
+        "publishedTime": "",
+    }
+
+
+# Stop reusing an info this long before its urls expire, enough for a
+# download to finish. Streaming from a url needs it for the whole track, see
+# _streamable().
+INFO_EXPIRY_MARGIN = 5 * 60
+# For infos without googlevideo urls, which don't say when they expire.
+INFO_DEFAULT_TTL = 5 * 60
+EXPIRE = re.compile(r"[?&/]expire[=/](\d+)")
+
+
+def _expires(info: dict) -> Optional[int]:
+    expires = [
+        int(match.group(1))
+        for fmt in (info.get("formats") or []) + [info]
+        for url in (fmt.get("url"), fmt.get("manifest_url"))
+        if url
+        for match in [EXPIRE.search(url)]
+        if match
+    ]
+    return min(expires) if expires else None
+
+
+def _info_ttl(info: dict) -> float:
+    expires = _expires(info)
+    if expires is None:
+        return INFO_DEFAULT_TTL
+    return expires - time.time() - INFO_EXPIRY_MARGIN
+
+
+def _streamable(info: dict) -> bool:
+    """Whether a cached info's urls outlive playing the whole track from them."""
+    if info.get("is_live"):
+        return False
+    expires = _expires(info)
+    if expires is None:
+        return True
+    return expires - time.time() > (info.get("duration") or 0) + INFO_EXPIRY_MARGIN
+
+
+# yt-dlp infos per video id, reused until their stream urls are about to expire.
+info_cache = TLRUCache(
+    maxsize=config.INFO_CACHE_SIZE, ttu=lambda _, info, now: now + _info_ttl(info)
+)
+
+
 def _origin_referer_headers() -> Dict[str, str]:
     base = (API_URL or "").rstrip("/") + "/"
     h = dict(BROWSER_HEADERS)
@@ -82,71 +166,68 @@ async def download_with_api(video_id: str, download_mode: str = "audio") -> Opti
 
         params = {"url": video_url, "format": fmt}
         headers = _origin_referer_headers()
-        limits = httpx.Limits(max_connections=100, max_keepalive_connections=50)
         timeout = httpx.Timeout(TIMEOUT, read=DOWNLOAD_TIMEOUT)
 
-        async with httpx.AsyncClient(
-            limits=limits,
-            timeout=timeout,
-            headers=headers,
-            follow_redirects=True,
-        ) as client:
-            r = await client.get(endpoint, params=params)
-            if r.status_code != 200:
-                return None
+        r = await http_client.get(
+            endpoint, params=params, headers=headers, timeout=timeout
+        )
+        if r.status_code != 200:
+            return None
 
+        try:
+            data = r.json()
+        except Exception:
             try:
-                data = r.json()
+                data = json.loads(r.text)
             except Exception:
-                try:
-                    data = json.loads(r.text)
-                except Exception:
-                    return None
-
-            if str(data.get("status", "")).lower() != "success":
                 return None
 
-            download_url = data.get("download_url")
-            if not download_url:
-                return None
+        if str(data.get("status", "")).lower() != "success":
+            return None
 
-            head = await client.head(
-                download_url,
-                headers={"Accept-Encoding": "identity"},
-            )
-            if head.status_code not in (200, 206):
-                pass
+        download_url = data.get("download_url")
+        if not download_url:
+            return None
 
-            cl = head.headers.get("Content-Length")
-            if cl:
-                try:
-                    size_mb = int(cl) / (1024 * 1024)
-                    if size_mb > MAX_SIZE_MB:
-                        return None
-                except Exception:
-                    pass
-
-            os.makedirs("downloads", exist_ok=True)
-            tmp = file_path + ".part"
-
-            async with client.stream(
-                "GET",
-                download_url,
-                headers={"Accept-Encoding": "identity"},
-            ) as resp:
-                if resp.status_code not in (200, 206):
+        head = await http_client.head(
+            download_url,
+            headers={**headers, "Accept-Encoding": "identity"},
+            timeout=timeout,
+        )
+        if head.status_code not in (200, 206):
+            pass
+
+        cl = head.headers.get("Content-Length")
+        if cl:
+            try:
+                size_mb = int(cl) / (1024 * 1024)
+                if size_mb > MAX_SIZE_MB:
                     return None
-                async with aiofiles.open(tmp, "wb") as f:
-                    async for chunk in resp.aiter_bytes(CHUNK_SIZE):
-                        if chunk:
-                            await f.write(chunk)
+            except Exception:
+                pass
+
+        os.makedirs("downloads", exist_ok=True)
+        tmp = file_path + ".part"
+
+        async with http_client.stream(
+            "GET",
+            download_url,
+            headers={**headers, "Accept-Encoding": "identity"},
+            timeout=timeout,
+        ) as resp:
+            if resp.status_code not in (200, 206):
+                return None
+            async with aiofiles.open(tmp, "wb") as f:
+                async for chunk in resp.aiter_bytes(CHUNK_SIZE):
+                    if chunk:
+                        await f.write(chunk)
 
-            if os.path.exists(tmp) and os.path.getsize(tmp) > 0:
-                os.replace(tmp, file_path)
+        if os.path.exists(tmp) and os.path.getsize(tmp) > 0:
+            os.replace(tmp, file_path)
 
         if os.path.getsize(file_path) > 0:
             logger.info(f"API success: {video_id} -> {ext}")
-            return file_path
+            return media_cache.add(video_id, download_mode, file_path)
         return None
     except Exception:
         try:
@@ -218,9 +299,7 @@ class YouTubeAPI:
 
     async def _get_info(self, link: str) -> Dict[str, Any]:
         try:
-            results = VideosSearch(link, limit=1)
-            result_data = await asyncio.wait_for(results.next(), timeout=TIMEOUT)
-            return result_data["result"][0] if result_data["result"] else {}
+            return await search_cache.first(link, timeout=TIMEOUT)
         except Exception:
             return {}
 
@@ -269,40 +348,70 @@ class YouTubeAPI:
         thumbnails = result.get("thumbnails", [])
         return thumbnails[0].get("url", "").split("?")[0] if thumbnails else ""
 
+    async def _extract(self, link: str, video_id: Optional[str]) -> Optional[dict]:
+        info = await extractor.run(
+            ytdlp_jobs.extract_info,
+            link,
+            cookie_txt_file(),
+            BROWSER_HEADERS,
+            timeout=TIMEOUT,
+            name=f"info {link}",
+        )
+        if info and video_id:
+            info_cache[video_id] = info
+        return info
+
+    async def extract(self, link: str, stream: bool = False) -> Optional[dict]:
+        """Unprocessed yt-dlp info of a video, extracted once per video while its urls are valid.
+
+        Jobs pick their formats from it with process_ie_result instead of
+        extracting the page again. With stream, a cached info is only reused
+        if its urls stay valid for the whole track, never for live streams."""
+        try:
+            video_id = self.extract_video_id(link)
+        except ValueError:
+            return await self._extract(link, None)
+        info = info_cache.get(video_id)
+        if info is not None and stream and not _streamable(info):
+            info = None
+        if info is None:
+            info = await extracting.do(video_id, self._extract, link, video_id)
+        return info
+
+    def forget(self, link: str):
+        try:
+            info_cache.pop(self.extract_video_id(link), None)
+        except ValueError:
+            pass
+
     async def video(self, link: str, videoid: Union[bool, str] = None) -> Tuple[int, str]:
         link = self._prepare_link(link, videoid)
         try:
-            proc = await asyncio.wait_for(
-                asyncio.create_subprocess_exec(
-                    "yt-dlp",
-                    "--cookies",
-                    cookie_txt_file(),
-                    "-g",
-                    "-f",
-                    "best[height<=?720][width<=?1280]",
-                    link,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                ),
+            info = await self.extract(link, stream=True)
+            url = await extractor.run(
+                ytdlp_jobs.direct_url,
+                info,
+                "best[height<=?720][width<=?1280]",
                 timeout=TIMEOUT,
+                name=f"url {link}",
             )
-            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=TIMEOUT)
-            if stdout:
-                url = stdout.decode().split("\n")[0].strip()
-                return (1, url) if url else (0, "No URL found")
-            else:
-                return 0, stderr.decode()
-        except Exception:
+            if not url:
+                self.forget(link)
+            return (1, url) if url else (0, "No URL found")
+        except asyncio.TimeoutError:
+            self.forget(link)
             return 0, "Timeout or error occurred"
+        except Exception as e:
+            self.forget(link)
+            return 0, str(e)
 
     async def slider(
         self, link: str, query_type: int, videoid: Union[bool, str] = None
     ) -> Tuple[str, str, str, str]:
         link = self._prepare_link(link, videoid)
         try:
-            results = VideosSearch(link, limit=min(query_type + 1, 10))
-            result_data = await asyncio.wait_for(results.next(), timeout=TIMEOUT)
-            result_list = result_data.get("result", [])
+            # Always ask for the full page, so paging through the slider is one search.
+            result_list = await search_cache.search(link, 10, timeout=TIMEOUT)
             if query_type < len(result_list):
                 item = result_list[query_type]
                 return (
@@ -328,32 +437,21 @@ class YouTubeAPI:
         if "&" in link:
             link = link.split("&", 1)[0]
         try:
-            def get_playlist_ids():
-                ydl_opts = {
-                    "quiet": True,
-                    "no_warnings": True,
-                    "extract_flat": True,
-                    "skip_download": True,
-                    "cookiefile": cookie_txt_file(),
-                }
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(link, download=False)
-                    if not info:
-                        return []
-                    entries = info.get("entries", []) or []
-                    ids = []
-                    for entry in entries[:limit]:
-                        vid = entry.get("id")
-                        if vid:
-                            ids.append(vid)
-                    return ids
-
-            loop = asyncio.get_running_loop()
-            ids = await asyncio.wait_for(
-                loop.run_in_executor(None, get_playlist_ids),
+            entries = await extractor.run(
+                ytdlp_jobs.flat_playlist,
+                link,
+                limit,
+                cookie_txt_file(),
                 timeout=TIMEOUT,
+                name=f"playlist {link}",
             )
-            return ids
+            # The flat entries already carry title and duration, keep them so
+            # queueing the playlist doesn't search every video again.
+            for entry in entries:
+                result = _flat_result(entry)
+                if result:
+                    search_cache.remember(result)
+            return [entry["id"] for entry in entries]
         except Exception as e:
             logger.error(f"Playlist parse error for {link}: {e}")
             return []
@@ -403,155 +501,104 @@ class YouTubeAPI:
 
         os.makedirs("downloads", exist_ok=True)
 
-        def ytdlp_audio():
-            try:
-                opts = {
-                    "format": "bestaudio/best",
-                    "outtmpl": "downloads/%(id)s.%(ext)s",
-                    "quiet": True,
-                    "cookiefile": cookie_txt_file(),
-                    "no_warnings": True,
-                    "concurrent_fragment_downloads": FRAGMENTS,
-                    "http_headers": BROWSER_HEADERS,
-                }
-                ydl = yt_dlp.YoutubeDL(opts)
-                info = ydl.extract_info(link, download=False)
-                if not info:
-                    return None
-                file_path = os.path.join("downloads", f"{info['id']}.{info['ext']}")
-                if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-                    return file_path
-                ydl.download([link])
-                return (
-                    file_path
-                    if os.path.exists(file_path)
-                    and os.path.getsize(file_path) > 0
-                    else None
-                )
-            except Exception:
-                return None
-
-        def ytdlp_video():
-            try:
-                opts = {
-                    "format": "best[height<=720][ext=mp4]/best[ext=mp4]/best",
-                    "outtmpl": "downloads/%(id)s.%(ext)s",
-                    "quiet": True,
-                    "cookiefile": cookie_txt_file(),
-                    "no_warnings": True,
-                    "merge_output_format": "mp4",
-                    "concurrent_fragment_downloads": FRAGMENTS,
-                    "http_headers": BROWSER_HEADERS,
-                }
-                ydl = yt_dlp.YoutubeDL(opts)
-                info = ydl.extract_info(link, download=False)
-                if not info:
-                    return None
-                file_path = os.path.join("downloads", f"{info['id']}.mp4")
-                if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-                    return file_path
-                ydl.download([link])
-                return (
-                    file_path
-                    if os.path.exists(file_path)
-                    and os.path.getsize(file_path) > 0
-                    else None
-                )
-            except Exception:
-                return None
-
-        def ytdlp_song_video():
-            if not format_id or not title:
-                return None
-            try:
-                opts = {
-                    "format": f"{format_id}+140",
-                    "outtmpl": f"downloads/{title}",
-                    "quiet": True,
-                    "cookiefile": cookie_txt_file(),
-                    "no_warnings": True,
-                    "merge_output_format": "mp4",
-                    "concurrent_fragment_downloads": FRAGMENTS,
-                    "http_headers": BROWSER_HEADERS,
-                }
-                ydl = yt_dlp.YoutubeDL(opts)
-                ydl.download([link])
-                result_path = f"downloads/{title}.mp4"
-                return (
-                    result_path
-                    if os.path.exists(result_path)
-                    and os.path.getsize(result_path) > 0
-                    else None
-                )
-            except Exception:
-                return None
+        def audio_opts():
+            return {
+                "format": "bestaudio/best",
+                "outtmpl": "downloads/%(id)s.%(ext)s",
+                "quiet": True,
+                "cookiefile": cookie_txt_file(),
+                "no_warnings": True,
+                "concurrent_fragment_downloads": FRAGMENTS,
+                "http_headers": BROWSER_HEADERS,
+            }, None
+
+        def video_opts():
+            return {
+                "format": "best[height<=720][ext=mp4]/best[ext=mp4]/best",
+                "outtmpl": "downloads/%(id)s.%(ext)s",
+                "quiet": True,
+                "cookiefile": cookie_txt_file(),
+                "no_warnings": True,
+                "merge_output_format": "mp4",
+                "concurrent_fragment_downloads": FRAGMENTS,
+                "http_headers": BROWSER_HEADERS,
+            }, os.path.join("downloads", f"{video_id}.mp4")
+
+        def song_video_opts():
+            return {
+                "format": f"{format_id}+140",
+                "outtmpl": f"downloads/{title}",
+                "quiet": True,
+                "cookiefile": cookie_txt_file(),
+                "no_warnings": True,
+                "merge_output_format": "mp4",
+                "concurrent_fragment_downloads": FRAGMENTS,
+                "http_headers": BROWSER_HEADERS,
+            }, f"downloads/{title}.mp4"
+
+        def song_audio_opts():
+            return {
+                "format": format_id,
+                "outtmpl": f"downloads/{title}.%(ext)s",
+                "quiet": True,
+                "cookiefile": cookie_txt_file(),
+                "no_warnings": True,
+                "postprocessors": [
+                    {
+                        "key": "FFmpegExtractAudio",
+                        "preferredcodec": "mp3",
+                        "preferredquality": "192",
+                    }
+                ],
+                "concurrent_fragment_downloads": FRAGMENTS,
+                "http_headers": BROWSER_HEADERS,
+            }, f"downloads/{title}.mp3"
+
+        async def fetch(mode):
+            cached = media_cache.get(video_id, mode)
+            if cached:
+                return cached
+            api_path = await download_with_api(video_id, mode)
+            if api_path:
+                return api_path
+            return await run(video_opts if mode == "video" else audio_opts, mode)
 
-        def ytdlp_song_audio():
-            if not format_id or not title:
-                return None
+        async def run(options, name):
+            info = await self.extract(link)
+            opts, path = options()
             try:
-                opts = {
-                    "format": format_id,
-                    "outtmpl": f"downloads/{title}.%(ext)s",
-                    "quiet": True,
-                    "cookiefile": cookie_txt_file(),
-                    "no_warnings": True,
-                    "postprocessors": [
-                        {
-                            "key": "FFmpegExtractAudio",
-                            "preferredcodec": "mp3",
-                            "preferredquality": "192",
-                        }
-                    ],
-                    "concurrent_fragment_downloads": FRAGMENTS,
-                    "http_headers": BROWSER_HEADERS,
-                }
-                ydl = yt_dlp.YoutubeDL(opts)
-                ydl.download([link])
-                result_path = f"downloads/{title}.mp3"
-                return (
-                    result_path
-                    if os.path.exists(result_path)
-                    and os.path.getsize(result_path) > 0
-                    else None
+                result = await extractor.run(
+                    ytdlp_jobs.download,
+                    info,
+                    opts,
+                    path,
+                    timeout=config.DOWNLOAD_TIMEOUT,
+                    name=f"{name} {video_id}",
                 )
             except Exception:
-                return None
+                self.forget(link)
+                raise
+            if not result:
+                # Most likely its urls stopped working, extract it again next time.
+                self.forget(link)
+            elif not songvideo and not songaudio:
+                media_cache.add(video_id, name, result)
+            return result
 
         try:
-            loop = asyncio.get_running_loop()
+            if (songvideo or songaudio) and not (format_id and title):
+                return None, False
 
             if songvideo:
-                result = await asyncio.wait_for(
-                    loop.run_in_executor(None, ytdlp_song_video),
-                    timeout=DOWNLOAD_TIMEOUT,
-                )
+                result = await run(song_video_opts, "song video")
                 return result, result is not None
 
             if songaudio:
-                result = await asyncio.wait_for(
-                    loop.run_in_executor(None, ytdlp_song_audio),
-                    timeout=DOWNLOAD_TIMEOUT,
-                )
+                result = await run(song_audio_opts, "song audio")
                 return result, result is not None
 
-            if video:
-                api_path = await download_with_api(video_id, "video")
-                if api_path:
-                    return api_path, True
-                result = await asyncio.wait_for(
-                    loop.run_in_executor(None, ytdlp_video),
-                    timeout=DOWNLOAD_TIMEOUT,
-                )
-                return result, result is not None
-
-            api_path = await download_with_api(video_id, "audio")
-            if api_path:
-                return api_path, True
-            result = await asyncio.wait_for(
-                loop.run_in_executor(None, ytdlp_audio),
-                timeout=DOWNLOAD_TIMEOUT,
-            )
+            mode = "video" if video else "audio"
+            result = await inflight.do((video_id, mode), fetch, mode)
             return result, result is not None
 
         except asyncio.TimeoutError:
@@ -1,6 +1,27 @@
+import asyncio
 import glob
+import importlib
+import time
 from os.path import dirname, isfile
 
+from pyrogram import filters
+from pyrogram.handlers import CallbackQueryHandler, MessageHandler
+from pyrogram.types import Message
+
+import config
+
+from ..logging import LOGGER
+
+# Rarely used plugins and what should trigger their import when lazy loaded.
+LAZY_TRIGGERS = {
+    ".sudo.aeval": (["eval", "sh"], r"^runtime"),
+    ".tools.history": (["sg", "History"], None),
+    ".tools.speedtest": (["speedtest", "spt"], None),
+}
+
+loaded = {}
+tasks = []
+
 
 def __list_all_modules():
     work_dir = dirname(__file__)
@@ -15,5 +36,98 @@ def __list_all_modules():
     return all_modules
 
 
+def _names(value: str) -> set:
+    return {"." + x.strip().strip(".") for x in value.split(",") if x.strip()}
+
+
+def _enabled(module: str) -> bool:
+    sets = _names(config.PLUGIN_SETS)
+    if sets and "." + module.split(".")[1] not in sets:
+        return False
+    return module not in _names(config.DISABLED_PLUGINS)
+
+
+def _import(module: str) -> float:
+    start = time.perf_counter()
+    loaded[module] = importlib.import_module("AnonXMusic.plugins" + module)
+    return time.perf_counter() - start
+
+
+def _import_recording(app, module: str) -> list:
+    """Imports a plugin, returning the (group, handler)s it registered."""
+    added = []
+    add_handler = app.add_handler
+
+    def record(handler, group: int = 0):
+        added.append((group, handler))
+        return add_handler(handler, group)
+
+    app.add_handler = record
+    try:
+        took = _import(module)
+    finally:
+        del app.add_handler
+    LOGGER(__name__).info(f"Lazily imported {module} in {took * 1000:.0f}ms.")
+    return added
+
+
+def _defer(app, module: str):
+    commands, callbacks = LAZY_TRIGGERS[module]
+    stubs = []
+
+    async def stub(client, update):
+        if module in loaded:
+            return
+        added = _import_recording(app, module)
+        for handler, group in stubs:
+            app.remove_handler(handler, group)
+        await _redispatch(client, update, added)
+
+    stubs.append((MessageHandler(stub, filters.command(commands)), 100))
+    if callbacks:
+        stubs.append((CallbackQueryHandler(stub, filters.regex(callbacks)), 100))
+    for handler, group in stubs:
+        app.add_handler(handler, group)
+
+
+async def _redispatch(client, update, added: list):
+    # The dispatcher only adds the new handlers once this update is done with,
+    # hand the update straight to the first one that wants it instead.
+    kind = MessageHandler if isinstance(update, Message) else CallbackQueryHandler
+    for _, handler in sorted(added, key=lambda x: x[0]):
+        if not isinstance(handler, kind):
+            continue
+        if await handler.check(client, update):
+            return await handler.callback(client, update)
+
+
+async def load_plugins(app):
+    lazy = _names(config.LAZY_PLUGINS)
+    profile = []
+    for module in ALL_MODULES:
+        if not _enabled(module):
+            continue
+        if module in lazy and module in LAZY_TRIGGERS:
+            _defer(app, module)
+            continue
+        profile.append((module, _import(module)))
+    for module in loaded.values():
+        tasks.extend(getattr(module, "BACKGROUND_TASKS", ()))
+
+    total = sum(took for _, took in profile)
+    report = "\n".join(
+        f"  {module}: {took * 1000:.0f}ms"
+        for module, took in sorted(profile, key=lambda x: -x[1])
+    )
+    LOGGER(__name__).info(
+        f"Imported {len(profile)} modules in {total * 1000:.0f}ms:\n{report}"
+    )
+
+
+def start_background_tasks():
+    for task in tasks:
+        asyncio.create_task(task())
+
+
 ALL_MODULES = sorted(__list_all_modules())
 __all__ = ALL_MODULES + ["ALL_MODULES"]
@@ -5,10 +5,12 @@ import config
 from AnonXMusic import YouTube, app
 from AnonXMusic.core.call import Anony
 from AnonXMusic.misc import db
-from AnonXMusic.utils.database import get_loop
+from AnonXMusic.utils.database import get_loop, is_music_playing
 from AnonXMusic.utils.decorators import AdminRightsCheck
 from AnonXMusic.utils.inline import close_markup, stream_markup
 from AnonXMusic.utils.stream.autoclear import auto_clean
+from AnonXMusic.utils.stream.position import start_clock
+from AnonXMusic.utils.stream.prefetch import prefetcher
 from AnonXMusic.utils.thumbnails import get_thumb
 from config import BANNED_USERS
 
@@ -89,13 +91,14 @@ async def skip(cli, message: Message, _, chat_id):
                 return await Anony.stop_stream(chat_id)
             except:
                 return
+    prefetcher.schedule(chat_id)
     queued = check[0]["file"]
     title = (check[0]["title"]).title()
     user = check[0]["by"]
     streamtype = check[0]["streamtype"]
     videoid = check[0]["vidid"]
     status = True if str(streamtype) == "video" else None
-    db[chat_id][0]["played"] = 0
+    start_clock(db[chat_id][0], await is_music_playing(chat_id))
     exis = (check[0]).get("old_dur")
     if exis:
         db[chat_id][0]["dur"] = exis
@@ -1,49 +1,77 @@
+import asyncio
+
+from cachetools import TTLCache
 from pyrogram.types import (
     InlineKeyboardButton,
     InlineKeyboardMarkup,
     InlineQueryResultPhoto,
 )
-from youtubesearchpython.future import VideosSearch
 
+import config
 from AnonXMusic import app
+from AnonXMusic.logging import LOGGER
 from AnonXMusic.utils.inlinequery import answer
+from AnonXMusic.utils.search import search_cache
 
 from config import BANNED_USERS
 
+PAGE_SIZE = 10
+SEARCH_LIMIT = 20
 
-@app.on_inline_query(~BANNED_USERS)
-async def inline_query_handler(client, query):
-    text = query.query.strip().lower()
-    answers = []
-    if text.strip() == "":
-        try:
-            await client.answer_inline_query(query.id, results=answer, cache_time=10)
-        except:
-            return
-    else:
-        a = VideosSearch(text, limit=20)
-        result = (await a.next()).get("result")
-        for x in range(15):
-            title = (result[x]["title"]).title()
-            duration = result[x]["duration"]
-            views = result[x]["viewCount"]["short"]
-            thumbnail = result[x]["thumbnails"][0]["url"].split("?")[0]
-            channellink = result[x]["channel"]["link"]
-            channel = result[x]["channel"]["name"]
-            link = result[x]["link"]
-            published = result[x]["publishedTime"]
-            description = f"{views} | {duration} ᴍɪɴᴜᴛᴇs | {channel}  | {published}"
-            buttons = InlineKeyboardMarkup(
-                [
-                    [
-                        InlineKeyboardButton(
-                            text="ʏᴏᴜᴛᴜʙᴇ 🎄",
-                            url=link,
-                        )
-                    ],
-                ]
-            )
-            searched_text = f"""
+# Latest query id per user, older ones are dropped once the user types on.
+latest = TTLCache(maxsize=10000, ttl=60)
+
+
+def _matches(result: dict, words: list) -> bool:
+    # Everything a YouTube search matches on that the result carries.
+    fields = [
+        result.get("title") or "",
+        (result.get("channel") or {}).get("name") or "",
+        *(x.get("text") or "" for x in result.get("descriptionSnippet") or []),
+        (result.get("accessibility") or {}).get("title") or "",
+    ]
+    haystack = " ".join(fields).lower()
+    return all(word in haystack for word in words)
+
+
+async def _results(text: str) -> list:
+    results = search_cache.get(text, SEARCH_LIMIT)
+    if results is not None:
+        return results
+    # "believer imag" is usually answered by what "believer" already found.
+    results = search_cache.prefixed(text)
+    if results:
+        words = text.split()
+        results = [x for x in results if _matches(x, words)]
+        if len(results) >= PAGE_SIZE:
+            return results
+    return await search_cache.search(text, SEARCH_LIMIT)
+
+
+def _photo(result: dict):
+    thumbnails = result.get("thumbnails") or []
+    link = result.get("link")
+    if not thumbnails or not link:
+        return None
+    title = (result.get("title") or "").title()
+    duration = result.get("duration") or "ʟɪᴠᴇ"
+    views = (result.get("viewCount") or {}).get("short") or "0 views"
+    thumbnail = thumbnails[0]["url"].split("?")[0]
+    channellink = (result.get("channel") or {}).get("link")
+    channel = (result.get("channel") or {}).get("name")
+    published = result.get("publishedTime") or "-"
+    description = f"{views} | {duration} ᴍɪɴᴜᴛᴇs | {channel}  | {published}"
+    buttons = InlineKeyboardMarkup(
+        [
+            [
+                InlineKeyboardButton(
+                    text="ʏᴏᴜᴛᴜʙᴇ 🎄",
+                    url=link,
+                )
+            ],
+        ]
+    )
+    searched_text = f"""
 ❄ <b>ᴛɪᴛʟᴇ :</b> <a href={link}>{title}</a>
 
 ⏳ <b>ᴅᴜʀᴀᴛɪᴏɴ :</b> {duration} ᴍɪɴᴜᴛᴇs
@@ -53,19 +81,55 @@ async def inline_query_handler(client, query):
 
 
 <u><b>➻ ɪɴʟɪɴᴇ sᴇᴀʀᴄʜ ᴍᴏᴅᴇ ʙʏ {app.name}</b></u>"""
-            answers.append(
-                InlineQueryResultPhoto(
-                    photo_url=thumbnail,
-                    title=title,
-                    thumb_url=thumbnail,
-                    description=description,
-                    caption=searched_text,
-                    reply_markup=buttons,
-                )
-            )
-        try:
-            return await client.answer_inline_query(query.id, results=answers)
-        except:
-            return
+    return InlineQueryResultPhoto(
+        photo_url=thumbnail,
+        title=title,
+        thumb_url=thumbnail,
+        description=description,
+        caption=searched_text,
+        reply_markup=buttons,
+    )
 
 
+@app.on_inline_query(~BANNED_USERS)
+async def inline_query_handler(client, query):
+    text = " ".join(query.query.lower().split())
+    if text == "":
+        try:
+            await client.answer_inline_query(query.id, results=answer, cache_time=10)
+        except Exception:
+            return
+        return
+    try:
+        offset = max(int(query.offset or 0), 0)
+    except ValueError:
+        offset = 0
+    if not offset:
+        latest[query.from_user.id] = query.id
+        await asyncio.sleep(config.INLINE_DEBOUNCE / 1000)
+        if latest.get(query.from_user.id) != query.id:
+            # Telegram waits for an answer to every query, even superseded ones.
+            try:
+                await client.answer_inline_query(query.id, results=[], cache_time=0)
+            except Exception:
+                pass
+            return
+    cache_time = config.INLINE_CACHE_TIME
+    try:
+        result = await _results(text)
+    except Exception as e:
+        LOGGER(__name__).warning(f"Inline search for {text!r} failed: {e}")
+        # Answered empty, but not cached so the next try searches again.
+        result, cache_time = [], 0
+    page = result[offset : offset + PAGE_SIZE]
+    answers = [x for x in map(_photo, page) if x]
+    next_offset = str(offset + PAGE_SIZE) if len(result) > offset + PAGE_SIZE else ""
+    try:
+        return await client.answer_inline_query(
+            query.id,
+            results=answers,
+            cache_time=cache_time,
+            next_offset=next_offset,
+        )
+    except Exception:
+        return
@@ -3,7 +3,6 @@ import time
 from pyrogram import filters
 from pyrogram.enums import ChatType
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Message
-from youtubesearchpython.future import VideosSearch
 
 import config
 from AnonXMusic import app
@@ -21,6 +20,7 @@ from AnonXMusic.utils.database import (
 from AnonXMusic.utils.decorators.language import LanguageStart
 from AnonXMusic.utils.formatters import get_readable_time
 from AnonXMusic.utils.inline import help_pannel, private_panel, start_panel
+from AnonXMusic.utils.search import search_cache
 from config import BANNED_USERS
 from strings import get_string
 
@@ -50,8 +50,7 @@ async def start_pm(client, message: Message, _):
             m = await message.reply_text("🔎")
             query = (str(name)).replace("info_", "", 1)
             query = f"https://www.youtube.com/watch?v={query}"
-            results = VideosSearch(query, limit=1)
-            for result in (await results.next())["result"]:
+            for result in await search_cache.search(query):
                 title = result["title"]
                 duration = result["duration"]
                 views = result["viewCount"]["short"]
@@ -82,9 +82,6 @@ async def auto_leave():
                 print(f"[ERROR] Assistant fetch failed: {e}")
 
 
-asyncio.create_task(auto_leave())
-
-
 async def auto_end():
     """Automatically end stream if no one is listening."""
     while True:
@@ -118,4 +115,4 @@ async def auto_end():
                     print(f"[ERROR] Couldn't send auto-end message: {e}")
 
 
-asyncio.create_task(auto_end())
+BACKGROUND_TASKS = (auto_leave, auto_end)
@@ -374,4 +374,4 @@ async def auto_clean():
             continue
 
 
-asyncio.create_task(auto_clean())
+BACKGROUND_TASKS = (auto_clean,)
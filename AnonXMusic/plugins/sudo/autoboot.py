@@ -6,10 +6,12 @@ from pyrogram import filters
 from AnonXMusic import app
 from AnonXMusic.misc import SUDOERS
 from AnonXMusic.utils.database import get_active_chats, remove_active_chat, remove_active_video_chat
+from AnonXMusic.utils.stream.persist import save_queues
 
 auto_restart_task: asyncio.Task | None = None  # Global task reference
 
 async def restart_bot():
+    await save_queues(force=True)
     ac_chats = await get_active_chats()
     for x in ac_chats:
         try:
@@ -22,8 +24,8 @@ async def restart_bot():
         except:
             pass
 
-    # Clean up
-    for folder in ["downloads", "raw_files", "cache"]:
+    # Clean up, downloads are kept for the media cache
+    for folder in ["raw_files", "cache"]:
         try:
             shutil.rmtree(folder)
         except:
@@ -0,0 +1,28 @@
+from pyrogram import filters
+from pyrogram.types import Message
+
+from AnonXMusic import app
+from AnonXMusic.core.extractor import extractor
+from AnonXMusic.misc import SUDOERS
+from AnonXMusic.utils.thumbnails import renderer
+
+
+def _format(title: str, stats: dict) -> str:
+    recent = stats.pop("recent", None)
+    text = f"<b><u>{title} :</u></b>\n"
+    text += "\n".join(f"<b>{key} :</b> <code>{value}</code>" for key, value in stats.items())
+    if recent:
+        text += "\n\n<b>recent :</b>\n" + "\n".join(
+            f"<code>{status} {took}ms</code> {name[:60]}" for name, status, took in recent
+        )
+    return text
+
+
+@app.on_message(filters.command(["workers"]) & SUDOERS)
+async def workers_stats(client, message: Message):
+    await message.reply_text(
+        _format("yt-dlp workers", extractor.stats())
+        + "\n\n"
+        + _format("thumbnail workers", renderer.stats()),
+        disable_web_page_preview=True,
+    )
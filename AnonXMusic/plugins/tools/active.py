@@ -7,6 +7,7 @@ from AnonXMusic.misc import SUDOERS
 from AnonXMusic.utils.database import (
     get_active_chats,
     get_active_video_chats,
+    get_assistant_load,
     remove_active_chat,
     remove_active_video_chat,
 )
@@ -74,3 +75,20 @@ async def activevi_(_, message: Message):
             f"<b>» ʟɪsᴛ ᴏғ ᴄᴜʀʀᴇɴᴛʟʏ ᴀᴄᴛɪᴠᴇ ᴠɪᴅᴇᴏ ᴄʜᴀᴛs :</b>\n\n{text}",
             disable_web_page_preview=True,
         )
+
+
+@app.on_message(filters.command(["assistants", "asload"]) & SUDOERS)
+async def assistant_load(_, message: Message):
+    load = await get_assistant_load()
+    if not load:
+        return await message.reply_text("» ɴᴏ ᴀssɪsᴛᴀɴᴛs ᴀʀᴇ ʀᴜɴɴɪɴɢ.")
+    text = ""
+    for x in load:
+        status = "ʜᴇᴀʟᴛʜʏ" if x["healthy"] else f"ᴜɴʜᴇᴀʟᴛʜʏ ({x['failures']} ғᴀɪʟᴜʀᴇs)"
+        text += (
+            f"<b>{x['assistant']}.</b> ᴄᴀʟʟs : <code>{x['calls']}</code> | "
+            f"ᴄʜᴀᴛs : <code>{x['chats']}</code> | "
+            f"ᴄᴀᴘᴀᴄɪᴛʏ : <code>{x['capacity']:g}</code> | "
+            f"ʟᴏᴀᴅ : <code>{x['load']:.2f}</code> | {status}\n"
+        )
+    await message.reply_text(f"<b>» ᴀssɪsᴛᴀɴᴛ ʟᴏᴀᴅ :</b>\n\n{text}")
@@ -1,8 +1,6 @@
 import asyncio
-import os
 
 from pyrogram import filters
-from pyrogram.errors import FloodWait
 from pyrogram.types import CallbackQuery, InputMediaPhoto, Message
 
 import config
@@ -12,16 +10,39 @@ from AnonXMusic.utils import AnonyBin, get_channeplayCB, seconds_to_min
 from AnonXMusic.utils.database import get_cmode, is_active_chat, is_music_playing
 from AnonXMusic.utils.decorators.language import language, languageCB
 from AnonXMusic.utils.inline import queue_back_markup, queue_markup
+from AnonXMusic.utils.stream.position import get_played
+from AnonXMusic.utils.stream.updater import updater
+from AnonXMusic.utils.thumbnails import thumb_cache
 from config import BANNED_USERS
 
 basic = {}
 
+QUEUE_UPDATE_INTERVAL = 5
+
 
 def get_image(videoid):
-    if os.path.isfile(f"cache/{videoid}.png"):
-        return f"cache/{videoid}.png"
-    else:
-        return config.YOUTUBE_IMG_URL
+    return thumb_cache.get(videoid, "thumb") or config.YOUTUBE_IMG_URL
+
+
+def queue_timer(_, chat_id, cplay, videoid, DUR, mystic):
+    async def render():
+        playing = db.get(chat_id)
+        if not playing or playing[0]["vidid"] != videoid:
+            return False
+        if not await is_active_chat(chat_id) or not basic.get(videoid):
+            return False
+        if not await is_music_playing(chat_id):
+            return
+        return mystic, queue_markup(
+            _,
+            DUR,
+            cplay,
+            videoid,
+            seconds_to_min(get_played(playing[0])),
+            playing[0]["dur"],
+        )
+
+    return render
 
 
 def get_duration(playing):
@@ -92,39 +113,20 @@ async def get_queue(client, message: Message, _):
             DUR,
             "c" if cplay else "g",
             videoid,
-            seconds_to_min(got[0]["played"]),
+            seconds_to_min(get_played(got[0])),
             got[0]["dur"],
         )
     )
     basic[videoid] = True
     mystic = await message.reply_photo(IMAGE, caption=cap, reply_markup=upl)
     if DUR != "Unknown":
-        try:
-            while db[chat_id][0]["vidid"] == videoid:
-                await asyncio.sleep(5)
-                if await is_active_chat(chat_id):
-                    if basic[videoid]:
-                        if await is_music_playing(chat_id):
-                            try:
-                                buttons = queue_markup(
-                                    _,
-                                    DUR,
-                                    "c" if cplay else "g",
-                                    videoid,
-                                    seconds_to_min(db[chat_id][0]["played"]),
-                                    db[chat_id][0]["dur"],
-                                )
-                                await mystic.edit_reply_markup(reply_markup=buttons)
-                            except FloodWait:
-                                pass
-                        else:
-                            pass
-                    else:
-                        break
-                else:
-                    break
-        except:
-            return
+        updater.touch(chat_id)
+        updater.watch(
+            ("queue", mystic.chat.id, mystic.id),
+            chat_id,
+            queue_timer(_, chat_id, "c" if cplay else "g", videoid, DUR, mystic),
+            QUEUE_UPDATE_INTERVAL,
+        )
 
 
 @app.on_callback_query(filters.regex("GetTimer") & ~BANNED_USERS)
@@ -232,7 +234,7 @@ async def queue_back(client, CallbackQuery: CallbackQuery, _):
             DUR,
             cplay,
             videoid,
-            seconds_to_min(got[0]["played"]),
+            seconds_to_min(get_played(got[0])),
             got[0]["dur"],
         )
     )
@@ -241,29 +243,10 @@ async def queue_back(client, CallbackQuery: CallbackQuery, _):
     med = InputMediaPhoto(media=IMAGE, caption=cap)
     mystic = await CallbackQuery.edit_message_media(media=med, reply_markup=upl)
     if DUR != "Unknown":
-        try:
-            while db[chat_id][0]["vidid"] == videoid:
-                await asyncio.sleep(5)
-                if await is_active_chat(chat_id):
-                    if basic[videoid]:
-                        if await is_music_playing(chat_id):
-                            try:
-                                buttons = queue_markup(
-                                    _,
-                                    DUR,
-                                    cplay,
-                                    videoid,
-                                    seconds_to_min(db[chat_id][0]["played"]),
-                                    db[chat_id][0]["dur"],
-                                )
-                                await mystic.edit_reply_markup(reply_markup=buttons)
-                            except FloodWait:
-                                pass
-                        else:
-                            pass
-                    else:
-                        break
-                else:
-                    break
-        except:
-            return
+        updater.touch(chat_id)
+        updater.watch(
+            ("queue", mystic.chat.id, mystic.id),
+            chat_id,
+            queue_timer(_, chat_id, cplay, videoid, DUR, mystic),
+            QUEUE_UPDATE_INTERVAL,
+        )
@@ -1,8 +1,17 @@
-import random
+import asyncio
 from typing import Dict, List, Union
 
+from cachetools import TTLCache
+from pyrogram.enums import ChatMemberStatus
+
+import config
 from AnonXMusic import userbot
+from AnonXMusic.core.balancer import balancer
+from AnonXMusic.core.flags import flags
 from AnonXMusic.core.mongo import mongodb
+from AnonXMusic.misc import db
+from AnonXMusic.utils.singleflight import SingleFlight
+from AnonXMusic.utils.stream.position import pause_clock, resume_clock
 
 authdb = mongodb.adminauth
 authuserdb = mongodb.authuser
@@ -15,9 +24,9 @@ channeldb = mongodb.cplaymode
 countdb = mongodb.upcount
 gbansdb = mongodb.gban
 langdb = mongodb.language
-onoffdb = mongodb.onoffper
 playmodedb = mongodb.playmode
 playtypedb = mongodb.playtypedb
+settingsdb = mongodb.chatsettings
 skipdb = mongodb.skipmode
 sudoersdb = mongodb.sudoers
 usersdb = mongodb.tgusersdb
@@ -27,16 +36,95 @@ active = []
 activevideo = []
 assistantdict = {}
 autoend = {}
-count = {}
-channelconnect = {}
-langm = {}
 loop = {}
-maintenance = []
-nonadmin = {}
 pause = {}
-playmode = {}
-playtype = {}
-skipmode = {}
+
+# Per chat settings, one document per chat in settingsdb
+chatsettings = TTLCache(
+    maxsize=config.SETTINGS_CACHE_SIZE, ttl=config.SETTINGS_CACHE_TTL
+)
+settings_loader = SingleFlight()
+# (assistant, chat_id) -> whether it is in the chat, asked before rebalancing
+membership = TTLCache(maxsize=config.SETTINGS_CACHE_SIZE, ttl=600)
+SETTINGS_DEFAULTS = {
+    "lang": "en",
+    "playmode": "Direct",
+    "playtype": "Everyone",
+    "cmode": None,
+    "nonadmin": False,
+    "skipmode": True,
+    "upvotes": 5,
+}
+
+
+async def _get_legacy_settings(chat_id: int) -> dict:
+    lang, pmode, ptype, cmode, auth, skip, upvotes = await asyncio.gather(
+        langdb.find_one({"chat_id": chat_id}),
+        playmodedb.find_one({"chat_id": chat_id}),
+        playtypedb.find_one({"chat_id": chat_id}),
+        channeldb.find_one({"chat_id": chat_id}),
+        authdb.find_one({"chat_id": chat_id}),
+        skipdb.find_one({"chat_id": chat_id}),
+        countdb.find_one({"chat_id": chat_id}),
+    )
+    settings = dict(SETTINGS_DEFAULTS)
+    if lang:
+        settings["lang"] = lang["lang"]
+    if pmode:
+        settings["playmode"] = pmode["mode"]
+    if ptype:
+        settings["playtype"] = ptype["mode"]
+    if cmode:
+        settings["cmode"] = cmode["mode"]
+    settings["nonadmin"] = bool(auth)
+    settings["skipmode"] = not skip
+    if upvotes:
+        settings["upvotes"] = upvotes["mode"]
+    return settings
+
+
+def _from_document(doc: dict) -> dict:
+    settings = dict(SETTINGS_DEFAULTS)
+    settings.update({k: doc[k] for k in SETTINGS_DEFAULTS if k in doc})
+    return settings
+
+
+async def _load_chat_settings(chat_id: int) -> dict:
+    doc = await settingsdb.find_one({"chat_id": chat_id})
+    if doc:
+        settings = _from_document(doc)
+    else:
+        # First time we see this chat, fold the old per-setting collections in.
+        settings = await _get_legacy_settings(chat_id)
+        await settingsdb.update_one(
+            {"chat_id": chat_id}, {"$set": settings}, upsert=True
+        )
+    chatsettings[chat_id] = settings
+    return settings
+
+
+async def get_chat_settings(chat_id: int) -> dict:
+    settings = chatsettings.get(chat_id)
+    if settings is None:
+        settings = await settings_loader.do(chat_id, _load_chat_settings, chat_id)
+    return settings
+
+
+async def set_chat_setting(chat_id: int, key: str, value):
+    settings = await get_chat_settings(chat_id)
+    settings[key] = value
+    chatsettings[chat_id] = settings
+    await settingsdb.update_one(
+        {"chat_id": chat_id}, {"$set": {key: value}}, upsert=True
+    )
+
+
+async def preload_chat_settings(chat_ids: list):
+    chat_ids = [x for x in chat_ids if x not in chatsettings]
+    if not chat_ids:
+        return
+    async for doc in settingsdb.find({"chat_id": {"$in": chat_ids}}):
+        chatsettings[doc["chat_id"]] = _from_document(doc)
 
 
 async def get_assistant_number(chat_id: int) -> str:
@@ -45,16 +133,7 @@ async def get_assistant_number(chat_id: int) -> str:
 
 
 async def get_client(assistant: int):
-    if int(assistant) == 1:
-        return userbot.one
-    elif int(assistant) == 2:
-        return userbot.two
-    elif int(assistant) == 3:
-        return userbot.three
-    elif int(assistant) == 4:
-        return userbot.four
-    elif int(assistant) == 5:
-        return userbot.five
+    return userbot.clients.get(int(assistant))
 
 
 async def set_assistant_new(chat_id, number):
@@ -66,58 +145,77 @@ async def set_assistant_new(chat_id, number):
     )
 
 
-async def set_assistant(chat_id):
+async def pick_assistant(chat_id: int) -> int:
     from AnonXMusic.core.userbot import assistants
 
-    ran_assistant = random.choice(assistants)
-    assistantdict[chat_id] = ran_assistant
+    assistantdict.pop(chat_id, None)
+    assistant = balancer.pick(assistants, assistantdict, active)
+    assistantdict[chat_id] = assistant
     await assdb.update_one(
         {"chat_id": chat_id},
-        {"$set": {"assistant": ran_assistant}},
+        {"$set": {"assistant": assistant}},
         upsert=True,
     )
-    userbot = await get_client(ran_assistant)
+    return assistant
+
+
+async def get_assistant_load() -> list:
+    from AnonXMusic.core.userbot import assistants
+
+    return balancer.stats(assistants, assistantdict, active)
+
+
+async def set_assistant(chat_id):
+    assistant = await pick_assistant(chat_id)
+    userbot = await get_client(assistant)
     return userbot
 
 
+async def _in_chat(assistant: int, chat_id: int) -> bool:
+    key = (assistant, chat_id)
+    if key in membership:
+        return membership[key]
+    client = await get_client(assistant)
+    try:
+        member = await client.get_chat_member(chat_id, "me")
+        result = member.status in (
+            ChatMemberStatus.MEMBER,
+            ChatMemberStatus.ADMINISTRATOR,
+            ChatMemberStatus.OWNER,
+        )
+    except Exception:
+        result = False
+    membership[key] = result
+    return result
+
+
 async def get_assistant(chat_id: int) -> str:
     from AnonXMusic.core.userbot import assistants
 
     assistant = assistantdict.get(chat_id)
     if not assistant:
         dbassistant = await assdb.find_one({"chat_id": chat_id})
-        if not dbassistant:
-            userbot = await set_assistant(chat_id)
-            return userbot
-        else:
-            got_assis = dbassistant["assistant"]
-            if got_assis in assistants:
-                assistantdict[chat_id] = got_assis
-                userbot = await get_client(got_assis)
-                return userbot
-            else:
-                userbot = await set_assistant(chat_id)
-                return userbot
-    else:
-        if assistant in assistants:
-            userbot = await get_client(assistant)
-            return userbot
-        else:
-            userbot = await set_assistant(chat_id)
-            return userbot
+        if dbassistant:
+            assistant = dbassistant["assistant"]
+            assistantdict[chat_id] = assistant
+    if assistant not in assistants:
+        return await set_assistant(chat_id)
+    # Nothing is playing here, hand the chat to a less busy assistant if needed,
+    # but only one that is already in it, joining could fail where this one didn't.
+    if chat_id not in active and balancer.should_move(
+        chat_id, assistants, assistantdict, active
+    ):
+        others = {k: v for k, v in assistantdict.items() if k != chat_id}
+        best = balancer.pick(assistants, others, active)
+        if best != assistant and await _in_chat(best, chat_id):
+            assistantdict[chat_id] = best
+            await set_assistant_new(chat_id, best)
+            return await get_client(best)
+    return await get_client(assistant)
 
 
 async def set_calls_assistant(chat_id):
-    from AnonXMusic.core.userbot import assistants
-
-    ran_assistant = random.choice(assistants)
-    assistantdict[chat_id] = ran_assistant
-    await assdb.update_one(
-        {"chat_id": chat_id},
-        {"$set": {"assistant": ran_assistant}},
-        upsert=True,
-    )
-    return ran_assistant
+    return await pick_assistant(chat_id)
 
 
 async def group_assistant(self, chat_id: int) -> int:
@@ -140,60 +238,27 @@ async def group_assistant(self, chat_id: int) -> int:
             assis = assistant
         else:
             assis = await set_calls_assistant(chat_id)
-    if int(assis) == 1:
-        return self.one
-    elif int(assis) == 2:
-        return self.two
-    elif int(assis) == 3:
-        return self.three
-    elif int(assis) == 4:
-        return self.four
-    elif int(assis) == 5:
-        return self.five
+    return self.calls.get(int(assis))
 
 
 async def is_skipmode(chat_id: int) -> bool:
-    mode = skipmode.get(chat_id)
-    if not mode:
-        user = await skipdb.find_one({"chat_id": chat_id})
-        if not user:
-            skipmode[chat_id] = True
-            return True
-        skipmode[chat_id] = False
-        return False
-    return mode
+    return (await get_chat_settings(chat_id))["skipmode"]
 
 
 async def skip_on(chat_id: int):
-    skipmode[chat_id] = True
-    user = await skipdb.find_one({"chat_id": chat_id})
-    if user:
-        return await skipdb.delete_one({"chat_id": chat_id})
+    await set_chat_setting(chat_id, "skipmode", True)
 
 
 async def skip_off(chat_id: int):
-    skipmode[chat_id] = False
-    user = await skipdb.find_one({"chat_id": chat_id})
-    if not user:
-        return await skipdb.insert_one({"chat_id": chat_id})
+    await set_chat_setting(chat_id, "skipmode", False)
 
 
 async def get_upvote_count(chat_id: int) -> int:
-    mode = count.get(chat_id)
-    if not mode:
-        mode = await countdb.find_one({"chat_id": chat_id})
-        if not mode:
-            return 5
-        count[chat_id] = mode["mode"]
-        return mode["mode"]
-    return mode
+    return (await get_chat_settings(chat_id))["upvotes"]
 
 
 async def set_upvotes(chat_id: int, mode: int):
-    count[chat_id] = mode
-    await countdb.update_one(
-        {"chat_id": chat_id}, {"$set": {"mode": mode}}, upsert=True
-    )
+    await set_chat_setting(chat_id, "upvotes", mode)
 
 
 async def is_autoend() -> bool:
@@ -226,76 +291,35 @@ async def set_loop(chat_id: int, mode: int):
 
 
 async def get_cmode(chat_id: int) -> int:
-    mode = channelconnect.get(chat_id)
-    if not mode:
-        mode = await channeldb.find_one({"chat_id": chat_id})
-        if not mode:
-            return None
-        channelconnect[chat_id] = mode["mode"]
-        return mode["mode"]
-    return mode
+    return (await get_chat_settings(chat_id))["cmode"]
 
 
 async def set_cmode(chat_id: int, mode: int):
-    channelconnect[chat_id] = mode
-    await channeldb.update_one(
-        {"chat_id": chat_id}, {"$set": {"mode": mode}}, upsert=True
-    )
+    await set_chat_setting(chat_id, "cmode", mode)
 
 
 async def get_playtype(chat_id: int) -> str:
-    mode = playtype.get(chat_id)
-    if not mode:
-        mode = await playtypedb.find_one({"chat_id": chat_id})
-        if not mode:
-            playtype[chat_id] = "Everyone"
-            return "Everyone"
-        playtype[chat_id] = mode["mode"]
-        return mode["mode"]
-    return mode
+    return (await get_chat_settings(chat_id))["playtype"]
 
 
 async def set_playtype(chat_id: int, mode: str):
-    playtype[chat_id] = mode
-    await playtypedb.update_one(
-        {"chat_id": chat_id}, {"$set": {"mode": mode}}, upsert=True
-    )
+    await set_chat_setting(chat_id, "playtype", mode)
 
 
 async def get_playmode(chat_id: int) -> str:
-    mode = playmode.get(chat_id)
-    if not mode:
-        mode = await playmodedb.find_one({"chat_id": chat_id})
-        if not mode:
-            playmode[chat_id] = "Direct"
-            return "Direct"
-        playmode[chat_id] = mode["mode"]
-        return mode["mode"]
-    return mode
+    return (await get_chat_settings(chat_id))["playmode"]
 
 
 async def set_playmode(chat_id: int, mode: str):
-    playmode[chat_id] = mode
-    await playmodedb.update_one(
-        {"chat_id": chat_id}, {"$set": {"mode": mode}}, upsert=True
-    )
+    await set_chat_setting(chat_id, "playmode", mode)
 
 
 async def get_lang(chat_id: int) -> str:
-    mode = langm.get(chat_id)
-    if not mode:
-        lang = await langdb.find_one({"chat_id": chat_id})
-        if not lang:
-            langm[chat_id] = "en"
-            return "en"
-        langm[chat_id] = lang["lang"]
-        return lang["lang"]
-    return mode
+    return (await get_chat_settings(chat_id))["lang"]
 
 
 async def set_lang(chat_id: int, lang: str):
-    langm[chat_id] = lang
-    await langdb.update_one({"chat_id": chat_id}, {"$set": {"lang": lang}}, upsert=True)
+    await set_chat_setting(chat_id, "lang", lang)
 
 
 async def is_music_playing(chat_id: int) -> bool:
@@ -307,10 +331,16 @@ async def is_music_playing(chat_id: int) -> bool:
 
 async def music_on(chat_id: int):
     pause[chat_id] = True
+    playing = db.get(chat_id)
+    if playing:
+        resume_clock(playing[0])
 
 
 async def music_off(chat_id: int):
     pause[chat_id] = False
+    playing = db.get(chat_id)
+    if playing:
+        pause_clock(playing[0])
 
 
 async def get_active_chats() -> list:
@@ -355,96 +385,44 @@ async def remove_active_video_chat(chat_id: int):
         activevideo.remove(chat_id)
 
 
-async def check_nonadmin_chat(chat_id: int) -> bool:
-    user = await authdb.find_one({"chat_id": chat_id})
-    if not user:
-        return False
-    return True
-
-
 async def is_nonadmin_chat(chat_id: int) -> bool:
-    mode = nonadmin.get(chat_id)
-    if not mode:
-        user = await authdb.find_one({"chat_id": chat_id})
-        if not user:
-            nonadmin[chat_id] = False
-            return False
-        nonadmin[chat_id] = True
-        return True
-    return mode
+    return (await get_chat_settings(chat_id))["nonadmin"]
 
 
 async def add_nonadmin_chat(chat_id: int):
-    nonadmin[chat_id] = True
-    is_admin = await check_nonadmin_chat(chat_id)
-    if is_admin:
-        return
-    return await authdb.insert_one({"chat_id": chat_id})
+    await set_chat_setting(chat_id, "nonadmin", True)
 
 
 async def remove_nonadmin_chat(chat_id: int):
-    nonadmin[chat_id] = False
-    is_admin = await check_nonadmin_chat(chat_id)
-    if not is_admin:
-        return
-    return await authdb.delete_one({"chat_id": chat_id})
+    await set_chat_setting(chat_id, "nonadmin", False)
 
 
 async def is_on_off(on_off: int) -> bool:
-    onoff = await onoffdb.find_one({"on_off": on_off})
-    if not onoff:
-        return False
-    return True
+    return await flags.get(on_off)
 
 
 async def add_on(on_off: int):
-    is_on = await is_on_off(on_off)
-    if is_on:
+    if await is_on_off(on_off):
         return
-    return await onoffdb.insert_one({"on_off": on_off})
+    await flags.set(on_off, True)
 
 
 async def add_off(on_off: int):
-    is_off = await is_on_off(on_off)
-    if not is_off:
+    if not await is_on_off(on_off):
         return
-    return await onoffdb.delete_one({"on_off": on_off})
+    await flags.set(on_off, False)
 
 
 async def is_maintenance():
-    if not maintenance:
-        get = await onoffdb.find_one({"on_off": 1})
-        if not get:
-            maintenance.clear()
-            maintenance.append(2)
-            return True
-        else:
-            maintenance.clear()
-            maintenance.append(1)
-            return False
-    else:
-        if 1 in maintenance:
-            return False
-        else:
-            return True
+    return not await is_on_off(1)
 
 
 async def maintenance_off():
-    maintenance.clear()
-    maintenance.append(2)
-    is_off = await is_on_off(1)
-    if not is_off:
-        return
-    return await onoffdb.delete_one({"on_off": 1})
+    await add_off(1)
 
 
 async def maintenance_on():
-    maintenance.clear()
-    maintenance.append(1)
-    is_on = await is_on_off(1)
-    if is_on:
-        return
-    return await onoffdb.insert_one({"on_off": 1})
+    await add_on(1)
 
 
 async def is_served_user(user_id: int) -> bool:
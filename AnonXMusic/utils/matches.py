@@ -0,0 +1,133 @@
+from typing import Iterable, List, NamedTuple, Optional
+
+from cachetools import LRUCache
+from pymongo import UpdateOne
+
+import config
+from AnonXMusic.core.mongo import mongodb
+from AnonXMusic.logging import LOGGER
+from AnonXMusic.utils.search import search_cache, watch_url
+
+matchesdb = mongodb.trackmatches
+
+FIELDS = ("vidid", "title", "duration", "thumb", "channel", "views")
+
+
+class TrackRef(NamedTuple):
+    """A track of another platform, not matched to a YouTube video yet."""
+
+    platform: str
+    track_id: str
+    query: str
+    isrc: Optional[str] = None
+
+    @property
+    def keys(self) -> List[str]:
+        keys = [f"{self.platform}:{self.track_id}"]
+        if self.isrc:
+            keys.append(f"isrc:{self.isrc.upper()}")
+        return keys
+
+
+def track_details(match: dict) -> dict:
+    return {
+        "title": match["title"],
+        "link": watch_url(match["vidid"]),
+        "vidid": match["vidid"],
+        "duration_min": match["duration"],
+        "thumb": match["thumb"],
+    }
+
+
+def match_from_result(result: dict, title: str = "") -> dict:
+    """The fields of a VideosSearch result kept in the index."""
+    return {
+        "vidid": result["id"],
+        "title": result.get("title") or title,
+        "duration": result.get("duration"),
+        "thumb": ((result.get("thumbnails") or [{}])[0].get("url") or "").split("?")[0],
+        "channel": (result.get("channel") or {}).get("name") or "",
+        "views": (result.get("viewCount") or {}).get("short") or "",
+    }
+
+
+class MatchIndex:
+    """Platform track id / ISRC -> YouTube video, in Mongo with an LRU in front."""
+
+    def __init__(self):
+        self.matches = LRUCache(maxsize=config.TRACK_MATCH_CACHE_SIZE)
+
+    def _remember(self, keys: Iterable[str], match: dict):
+        for key in keys:
+            self.matches[key] = match
+        # Whoever plays the match next looks it up by its watch URL.
+        search_cache.remember(
+            {
+                "id": match["vidid"],
+                "title": match["title"],
+                "duration": match["duration"],
+                "thumbnails": [{"url": match["thumb"]}],
+                "viewCount": {"short": match.get("views") or ""},
+                "channel": {"name": match.get("channel") or "", "link": ""},
+                "link": watch_url(match["vidid"]),
+                "publishedTime": "",
+            }
+        )
+
+    def _cached(self, keys: List[str]) -> Optional[dict]:
+        for key in keys:
+            match = self.matches.get(key)
+            if match:
+                return match
+        return None
+
+    async def preload(self, refs: Iterable[TrackRef]):
+        """Loads the stored matches of many tracks with one query."""
+        refs = [ref for ref in refs if not self._cached(ref.keys)]
+        keys = [key for ref in refs for key in ref.keys]
+        if not keys:
+            return
+        try:
+            found = {
+                doc["_id"]: {k: doc[k] for k in FIELDS if k in doc}
+                async for doc in matchesdb.find({"_id": {"$in": keys}})
+            }
+        except Exception as e:
+            LOGGER(__name__).warning(f"Could not load track matches: {e}")
+            return
+        for ref in refs:
+            match = next((found[key] for key in ref.keys if key in found), None)
+            if match:
+                self._remember(ref.keys, match)
+
+    async def get(self, ref: TrackRef) -> Optional[dict]:
+        match = self._cached(ref.keys)
+        if match is None:
+            await self.preload([ref])
+            match = self._cached(ref.keys)
+        return match
+
+    async def save(self, ref: TrackRef, match: dict):
+        self._remember(ref.keys, match)
+        try:
+            await matchesdb.bulk_write(
+                [UpdateOne({"_id": key}, {"$set": match}, upsert=True) for key in ref.keys],
+                ordered=False,
+            )
+        except Exception as e:
+            LOGGER(__name__).warning(f"Could not save track match {ref.keys}: {e}")
+
+    async def resolve(self, ref: TrackRef) -> Optional[dict]:
+        """The stored match, or the first YouTube search result for the track."""
+        match = await self.get(ref)
+        if match:
+            return match
+        result = await search_cache.first(ref.query)
+        if not result.get("id"):
+            return None
+        match = match_from_result(result, ref.query)
+        await self.save(ref, match)
+        return match
+
+
+match_index = MatchIndex()
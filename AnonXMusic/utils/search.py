@@ -0,0 +1,120 @@
+import asyncio
+import re
+from typing import List, Optional
+
+from cachetools import TTLCache
+from youtubesearchpython.future import VideosSearch
+
+import config
+from AnonXMusic.utils.singleflight import SingleFlight
+
+VIDEO_ID = re.compile(
+    r"(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|live/|embed/|v/)|youtu\.be/)([0-9A-Za-z_-]{11})"
+)
+
+
+def watch_url(video_id: str) -> str:
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def normalize(query: str) -> str:
+    query = " ".join(str(query or "").split())
+    match = VIDEO_ID.search(query)
+    if match:
+        return watch_url(match.group(1))
+    return query.lower()
+
+
+class SearchCache:
+    """Shared VideosSearch results, keyed by normalized query."""
+
+    def __init__(self):
+        self.results = TTLCache(
+            maxsize=config.SEARCH_CACHE_SIZE, ttl=config.SEARCH_CACHE_TTL
+        )
+        # Queries that found nothing, kept for a shorter while.
+        self.misses = TTLCache(
+            maxsize=config.SEARCH_CACHE_SIZE, ttl=config.SEARCH_NEGATIVE_TTL
+        )
+        self.inflight = SingleFlight()
+        self.hits = 0
+        self.lookups = 0
+
+    def _cached(self, key: str, limit: int) -> Optional[List[dict]]:
+        if key in self.misses:
+            return []
+        entry = self.results.get(key)
+        if entry is None:
+            return None
+        searched, results = entry
+        # A bigger search covers a smaller one, so does one that ran dry.
+        if searched >= limit or len(results) < searched:
+            return results[:limit]
+        return None
+
+    async def _search(self, key: str, query: str, limit: int, timeout: float) -> List[dict]:
+        data = await asyncio.wait_for(VideosSearch(query, limit=limit).next(), timeout)
+        results = (data or {}).get("result") or []
+        if not results:
+            self.misses[key] = True
+            return []
+        self.results[key] = (limit, results)
+        for result in results:
+            if result.get("id"):
+                link = watch_url(result["id"])
+                if link not in self.results:
+                    self.results[link] = (1, [result])
+        return results
+
+    def remember(self, result: dict):
+        """Seeds a video's entry with metadata found elsewhere, e.g. a playlist."""
+        link = watch_url(result["id"])
+        if link not in self.results:
+            self.results[link] = (1, [result])
+
+    def get(self, query: str, limit: int = 1) -> Optional[List[dict]]:
+        """Cached results only, None when a search would be needed."""
+        results = self._cached(normalize(query), limit)
+        return None if results is None else list(results)
+
+    def prefixed(self, query: str, min_length: int = 3) -> Optional[List[dict]]:
+        """Results of the longest cached search the query starts with."""
+        key = normalize(query)
+        if key.startswith("https://"):
+            return None
+        for end in range(len(key) - 1, min_length - 1, -1):
+            entry = self.results.get(key[:end])
+            if entry is not None:
+                return list(entry[1])
+        return None
+
+    async def search(
+        self, query: str, limit: int = 1, timeout: float = config.SEARCH_TIMEOUT
+    ) -> List[dict]:
+        key = normalize(query)
+        self.lookups += 1
+        results = self._cached(key, limit)
+        if results is not None:
+            self.hits += 1
+            return list(results)
+        # Links are looked up by their canonical form, text as typed.
+        query = key if key.startswith("https://") else query
+        results = await self.inflight.do(
+            (key, limit), self._search, key, query, limit, timeout
+        )
+        return list(results[:limit])
+
+    async def first(self, query: str, timeout: float = config.SEARCH_TIMEOUT) -> dict:
+        results = await self.search(query, 1, timeout)
+        return results[0] if results else {}
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.results),
+            "misses": len(self.misses),
+            "inflight": len(self.inflight),
+            "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0,
+        }
+
+
+search_cache = SearchCache()
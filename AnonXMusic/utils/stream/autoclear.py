@@ -1,5 +1,6 @@
 import os
 
+from AnonXMusic.core.cache import media_cache
 from config import autoclean
 
 
@@ -7,8 +8,11 @@ async def auto_clean(popped):
     try:
         rem = popped["file"]
         autoclean.remove(rem)
+        media_cache.unpin(rem)
         count = autoclean.count(rem)
         if count == 0:
+            if media_cache.is_cached(rem):
+                return
             if "vid_" not in rem or "live_" not in rem or "index_" not in rem:
                 try:
                     os.remove(rem)
@@ -0,0 +1,175 @@
+import asyncio
+import os
+
+from pymongo import DeleteOne, ReplaceOne
+
+import config
+from AnonXMusic import YouTube
+from AnonXMusic.core.cache import media_cache
+from AnonXMusic.core.mongo import mongodb
+from AnonXMusic.logging import LOGGER
+from AnonXMusic.misc import db
+from AnonXMusic.utils.database import get_active_chats
+from AnonXMusic.utils.formatters import seconds_to_min
+from AnonXMusic.utils.stream.position import get_played, set_played, start_clock
+from config import autoclean
+
+queuedb = mongodb.queues
+
+# Only plain values survive a restart, messages and markups are rebuilt.
+FIELDS = (
+    "title",
+    "dur",
+    "streamtype",
+    "by",
+    "user_id",
+    "chat_id",
+    "file",
+    "vidid",
+    "seconds",
+    "played",
+    "old_dur",
+    "old_second",
+)
+
+snapshots = {}
+# Chats joined at once while restoring queues after a restart.
+RESTORE_CONCURRENCY = 5
+
+
+def _serialize(queue: list) -> list:
+    items = [{k: item[k] for k in FIELDS if k in item} for item in queue]
+    if items:
+        items[0]["played"] = get_played(queue[0])
+    return items
+
+
+def _fingerprint(queue: list) -> tuple:
+    # "played" moves all the time, it alone isn't worth a write.
+    return tuple(
+        tuple((k, str(v)) for k, v in item.items() if k != "played")
+        for item in queue
+    )
+
+
+async def save_queues(force: bool = False):
+    active = set(await get_active_chats())
+    ops = []
+    seen = set()
+    for chat_id in active:
+        queue = _serialize(db.get(chat_id) or [])
+        if not queue:
+            continue
+        seen.add(chat_id)
+        fingerprint = _fingerprint(queue)
+        if not force and snapshots.get(chat_id) == fingerprint:
+            continue
+        snapshots[chat_id] = fingerprint
+        ops.append(
+            ReplaceOne(
+                {"chat_id": chat_id},
+                {"chat_id": chat_id, "queue": queue},
+                upsert=True,
+            )
+        )
+    for chat_id in list(snapshots):
+        if chat_id not in seen:
+            snapshots.pop(chat_id, None)
+            ops.append(DeleteOne({"chat_id": chat_id}))
+    if ops:
+        try:
+            await queuedb.bulk_write(ops, ordered=False)
+        except Exception as e:
+            LOGGER(__name__).warning(f"Failed to save queues: {e}")
+
+
+async def queue_snapshotter():
+    interval = config.QUEUE_SNAPSHOT_INTERVAL
+    if interval <= 0:
+        return
+    while not await asyncio.sleep(interval):
+        await save_queues()
+
+
+async def get_saved_queue_chats() -> list:
+    return [doc["chat_id"] async for doc in queuedb.find({}, {"chat_id": 1})]
+
+
+async def _resolve(item: dict):
+    file = str(item["file"])
+    video = str(item["streamtype"]) == "video"
+    if "live_" in file:
+        n, link = await YouTube.video(item["vidid"], True)
+        return link if n else None
+    if "vid_" in file:
+        file_path, _ = await YouTube.download(
+            item["vidid"], None, videoid=True, video=video
+        )
+        return file_path
+    if "index_" in file:
+        return item["vidid"]
+    return file if os.path.exists(file) else None
+
+
+async def _restore(doc: dict) -> bool:
+    from AnonXMusic.core.call import Anony
+
+    chat_id = doc["chat_id"]
+    queue = doc.get("queue") or []
+    try:
+        if not queue:
+            raise ValueError("empty queue")
+        played = int(queue[0].get("played") or 0)
+        live = "live_" in str(queue[0]["file"])
+        for item in queue:
+            item["played"] = 0
+            item["started"] = None
+        link = await _resolve(queue[0])
+        if not link:
+            raise ValueError("track unavailable")
+        mode = "video" if str(queue[0]["streamtype"]) == "video" else "audio"
+        await Anony.join_call(
+            chat_id,
+            queue[0]["chat_id"],
+            link,
+            video=True if mode == "video" else None,
+        )
+        if "vid_" in str(queue[0]["file"]):
+            queue[0]["file"] = link
+        start_clock(queue[0])
+        # Pick up where the last run left off, unless that's about the end.
+        seconds = int(queue[0].get("seconds") or 0)
+        if not live and 10 < played < seconds - 10:
+            try:
+                await Anony.seek_stream(
+                    chat_id, link, seconds_to_min(played), queue[0]["dur"], mode
+                )
+                set_played(queue[0], played)
+            except Exception as e:
+                LOGGER(__name__).warning(f"Could not seek restored queue of {chat_id}: {e}")
+        db[chat_id] = queue
+        for item in queue:
+            autoclean.append(item["file"])
+            media_cache.pin(item["file"])
+    except Exception as e:
+        db[chat_id] = []
+        await queuedb.delete_one({"chat_id": chat_id})
+        LOGGER(__name__).warning(f"Could not restore queue of {chat_id}: {e}")
+        return False
+    snapshots[chat_id] = _fingerprint(_serialize(queue))
+    return True
+
+
+async def restore_queues():
+    if config.QUEUE_SNAPSHOT_INTERVAL <= 0:
+        return
+    semaphore = asyncio.Semaphore(RESTORE_CONCURRENCY)
+
+    async def restore(doc):
+        async with semaphore:
+            return await _restore(doc)
+
+    docs = [doc async for doc in queuedb.find({})]
+    restored = sum(await asyncio.gather(*(restore(doc) for doc in docs)))
+    if restored:
+        LOGGER(__name__).info(f"Restored {restored} queues from the last run.")
@@ -0,0 +1,123 @@
+import asyncio
+import os
+from collections import deque
+from random import randint
+from typing import AsyncIterator, Iterable, Tuple
+
+import config
+from AnonXMusic import YouTube, app
+from AnonXMusic.logging import LOGGER
+from AnonXMusic.misc import db
+from AnonXMusic.utils.database import is_active_chat
+from AnonXMusic.utils.inline import close_markup
+from AnonXMusic.utils.matches import TrackRef, match_index
+from AnonXMusic.utils.pastebin import AnonyBin
+from AnonXMusic.utils.stream.queue import put_queue
+
+
+async def _details(item, videoid: bool):
+    try:
+        # Spotify tracks go through the match index, apple ones come matched.
+        if isinstance(item, TrackRef):
+            match = await match_index.resolve(item)
+            if not match:
+                return None
+            item, videoid = match["vidid"], True
+        elif isinstance(item, dict):
+            item, videoid = item["vidid"], True
+        details = await YouTube.details(item, videoid)
+    except Exception:
+        return None
+    title, duration_min, duration_sec, thumbnail, vidid = details
+    if str(duration_min) == "None":
+        return None
+    if duration_sec > config.DURATION_LIMIT:
+        return None
+    return details
+
+
+async def resolve_playlist(
+    items: Iterable, videoid: bool
+) -> AsyncIterator[Tuple[str, str, int, str, str]]:
+    """Yields the details of playable items in order.
+
+    Only PLAYLIST_CONCURRENCY lookups run ahead of the consumer, so a long
+    playlist is resolved as fast as it is queued and no faster."""
+    items = iter(items)
+    window = deque()
+
+    def fill():
+        while len(window) < config.PLAYLIST_CONCURRENCY:
+            item = next(items, None)
+            if item is None:
+                return
+            window.append(asyncio.create_task(_details(item, videoid)))
+
+    try:
+        fill()
+        while window:
+            details = await window.popleft()
+            fill()
+            if details:
+                yield details
+    finally:
+        for task in window:
+            task.cancel()
+
+
+async def queue_playlist(
+    _,
+    tracks,
+    chat_id,
+    original_chat_id,
+    user_name,
+    user_id,
+    video,
+    msg: str,
+    count: int,
+    position: int,
+):
+    """Queues the rest of a playlist, then posts the summary."""
+    try:
+        async for title, duration_min, duration_sec, thumbnail, vidid in tracks:
+            # The stream was ended while the tail was still being queued.
+            if not db.get(chat_id) or not await is_active_chat(chat_id):
+                break
+            await put_queue(
+                chat_id,
+                original_chat_id,
+                f"vid_{vidid}",
+                title,
+                duration_min,
+                user_name,
+                vidid,
+                user_id,
+                "video" if video else "audio",
+            )
+            position = len(db.get(chat_id)) - 1
+            count += 1
+            msg += f"{count}. {title[:70]}\n"
+            msg += f"{_['play_20']} {position}\n\n"
+        if count == 0:
+            return
+        link = await AnonyBin(msg)
+        lines = msg.count("\n")
+        if lines >= 17:
+            car = os.linesep.join(msg.split(os.linesep)[:17])
+        else:
+            car = msg
+        from AnonXMusic import Carbon
+
+        carbon = await Carbon.generate(car, randint(100, 10000000))
+        upl = close_markup(_)
+        await app.send_photo(
+            original_chat_id,
+            photo=carbon,
+            caption=_["play_21"].format(position, link),
+            has_spoiler=True,
+            reply_markup=upl,
+        )
+    except Exception as e:
+        LOGGER(__name__).warning(f"Failed to queue playlist in {chat_id}: {e}")
+    finally:
+        await tracks.aclose()
@@ -0,0 +1,38 @@
+import time
+
+# A queue entry's position is "played" seconds at the moment "started" (a
+# monotonic timestamp) was taken, "started" is None while it isn't running.
+
+
+def get_played(entry: dict) -> int:
+    played = entry.get("played", 0)
+    duration = int(entry.get("seconds") or 0)
+    if duration == 0:
+        return int(played)
+    started = entry.get("started")
+    if started is not None:
+        played += time.monotonic() - started
+    return int(min(played, duration))
+
+
+def set_played(entry: dict, seconds: int):
+    entry["played"] = max(0, seconds)
+    if entry.get("started") is not None:
+        entry["started"] = time.monotonic()
+
+
+def start_clock(entry: dict, running: bool = True):
+    entry["played"] = 0
+    entry["started"] = time.monotonic() if running else None
+
+
+def pause_clock(entry: dict):
+    if entry.get("started") is None:
+        return
+    entry["played"] = get_played(entry)
+    entry["started"] = None
+
+
+def resume_clock(entry: dict):
+    if entry.get("started") is None:
+        entry["started"] = time.monotonic()
@@ -0,0 +1,85 @@
+import asyncio
+import os
+from typing import Dict, Tuple
+
+import config
+from AnonXMusic import YouTube
+from AnonXMusic.core.cache import media_cache
+from AnonXMusic.logging import LOGGER
+from AnonXMusic.misc import db
+from config import autoclean
+
+
+class Prefetcher:
+    """Downloads the next few `vid_` entries of a queue while the current one plays."""
+
+    def __init__(self):
+        self.ahead = config.PREFETCH_TRACKS
+        self.budget = config.PREFETCH_DISK_BUDGET
+        self.semaphore = asyncio.Semaphore(max(1, config.PREFETCH_CONCURRENCY))
+        self.tasks: Dict[Tuple[int, str, str], asyncio.Task] = {}
+        self.reserved: Dict[str, int] = {}
+
+    def _upcoming(self, chat_id: int) -> list:
+        queue = db.get(chat_id) or []
+        return queue[1 : 1 + self.ahead]
+
+    def _release_played(self):
+        waiting = set()
+        for chat_id in list(db):
+            for item in (db.get(chat_id) or [])[1:]:
+                waiting.add(str(item.get("file")))
+        for path in list(self.reserved):
+            if path not in waiting:
+                self.reserved.pop(path, None)
+
+    def schedule(self, chat_id: int):
+        if self.ahead <= 0:
+            return
+        for item in self._upcoming(chat_id):
+            file = str(item.get("file"))
+            if not file.startswith("vid_"):
+                continue
+            mode = "video" if str(item.get("streamtype")) == "video" else "audio"
+            key = (chat_id, item["vidid"], mode)
+            if key in self.tasks:
+                continue
+            task = asyncio.create_task(self._prefetch(chat_id, item, mode))
+            self.tasks[key] = task
+            task.add_done_callback(lambda _, key=key: self.tasks.pop(key, None))
+
+    async def _prefetch(self, chat_id: int, item: dict, mode: str):
+        vidid = item["vidid"]
+        async with self.semaphore:
+            if not any(x is item for x in self._upcoming(chat_id)):
+                return
+            if not media_cache.get(vidid, mode):
+                self._release_played()
+                if sum(self.reserved.values()) >= self.budget:
+                    return
+            try:
+                file_path, direct = await YouTube.download(
+                    vidid, None, videoid=True, video=mode == "video"
+                )
+            except Exception as e:
+                LOGGER(__name__).warning(f"Prefetch failed for {vidid}: {e}")
+                return
+        if not file_path or not os.path.exists(file_path):
+            return
+        # The entry may have been skipped or started playing meanwhile.
+        queue = db.get(chat_id) or []
+        if not any(x is item for x in queue[1:]) or item["file"] != f"vid_{vidid}":
+            return
+        old = item["file"]
+        item["file"] = file_path
+        try:
+            autoclean.remove(old)
+        except ValueError:
+            pass
+        autoclean.append(file_path)
+        media_cache.unpin(old)
+        media_cache.pin(file_path)
+        self.reserved[file_path] = os.path.getsize(file_path)
+
+
+prefetcher = Prefetcher()
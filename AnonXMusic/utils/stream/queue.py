@@ -1,7 +1,11 @@
 import asyncio
 from typing import Union
 
+from AnonXMusic.core.cache import media_cache
 from AnonXMusic.misc import db
+from AnonXMusic.utils.database import is_music_playing
+from AnonXMusic.utils.stream.position import start_clock
+from AnonXMusic.utils.stream.prefetch import prefetcher
 from AnonXMusic.utils.formatters import check_duration, seconds_to_min
 from config import autoclean, time_to_seconds
 
@@ -34,6 +38,7 @@ async def put_queue(
         "vidid": vidid,
         "seconds": duration_in_seconds,
         "played": 0,
+        "started": None,
     }
     if forceplay:
         check = db.get(chat_id)
@@ -44,7 +49,11 @@ async def put_queue(
             db[chat_id].append(put)
     else:
         db[chat_id].append(put)
+    if db[chat_id][0] is put:
+        start_clock(put, await is_music_playing(chat_id))
     autoclean.append(file)
+    media_cache.pin(file)
+    prefetcher.schedule(chat_id)
 
 
 async def put_queue_index(
@@ -79,6 +88,7 @@ async def put_queue_index(
         "vidid": vidid,
         "seconds": dur,
         "played": 0,
+        "started": None,
     }
     if forceplay:
         check = db.get(chat_id)
@@ -89,3 +99,5 @@ async def put_queue_index(
             db[chat_id].append(put)
     else:
         db[chat_id].append(put)
+    if db[chat_id][0] is put:
+        start_clock(put, await is_music_playing(chat_id))
@@ -0,0 +1,149 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+
+from pyrogram.errors import FloodWait, MessageNotModified
+from pyrogram.types import InlineKeyboardMarkup
+
+import config
+from AnonXMusic.logging import LOGGER
+from AnonXMusic.misc import db
+from AnonXMusic.utils.database import get_lang, is_active_chat, is_music_playing
+from AnonXMusic.utils.formatters import seconds_to_min
+from AnonXMusic.utils.inline.play import stream_markup_timer
+from AnonXMusic.utils.stream.position import get_played
+from strings import get_string
+
+TICK = 0.5
+MAX_FAILURES = 3
+
+# A render callback returns (message, markup) to edit, None to skip this
+# round or False once the message shouldn't be updated anymore.
+Render = Callable[[], Awaitable]
+
+
+class Job:
+    def __init__(self, chat_id: int, render: Render, interval: float):
+        self.chat_id = chat_id
+        self.render = render
+        self.interval = interval
+        self.next_at = time.monotonic() + interval
+        self.last_markup: Optional[tuple] = None
+        self.failures = 0
+
+
+class MarkupUpdater:
+    """Edits every live-updating inline keyboard under one global rate limit."""
+
+    def __init__(self):
+        self.rate = config.MARKUP_EDIT_RATE
+        self.tokens = self.rate
+        self.refilled = time.monotonic()
+        self.backoff_until = 0.0
+        self.jobs: Dict[Hashable, Job] = {}
+        self.touched: Dict[int, float] = {}
+
+    def watch(
+        self,
+        key: Hashable,
+        chat_id: int,
+        render: Render,
+        interval: float = config.MARKUP_UPDATE_INTERVAL,
+    ):
+        self.jobs[key] = Job(chat_id, render, interval)
+
+    def unwatch(self, key: Hashable):
+        self.jobs.pop(key, None)
+
+    def unwatch_chat(self, chat_id: int):
+        for key in [k for k, job in self.jobs.items() if job.chat_id == chat_id]:
+            self.jobs.pop(key, None)
+        self.touched.pop(chat_id, None)
+
+    def touch(self, chat_id: int):
+        self.touched[chat_id] = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.rate, self.tokens + (now - self.refilled) * self.rate)
+        self.refilled = now
+
+    def _due(self, now: float) -> list:
+        due = [(key, job) for key, job in self.jobs.items() if job.next_at <= now]
+        due.sort(key=lambda x: (-self.touched.get(x[1].chat_id, 0), x[1].next_at))
+        return due
+
+    async def _update(self, key: Hashable, job: Job, now: float):
+        job.next_at = now + job.interval
+        result = await job.render()
+        if result is False:
+            return self.unwatch(key)
+        if not result:
+            return
+        message, markup = result
+        rendered = (message.id, str(markup))
+        if rendered == job.last_markup:
+            return
+        self.tokens -= 1
+        try:
+            await message.edit_reply_markup(reply_markup=markup)
+        except FloodWait as e:
+            self.backoff_until = time.monotonic() + e.value
+            job.next_at = self.backoff_until
+            LOGGER(__name__).warning(f"FloodWait of {e.value}s, pausing markup updates.")
+            return
+        except MessageNotModified:
+            pass
+        except Exception:
+            job.failures += 1
+            if job.failures >= MAX_FAILURES:
+                self.unwatch(key)
+            return
+        job.failures = 0
+        job.last_markup = rendered
+
+    async def run(self):
+        while not await asyncio.sleep(TICK):
+            now = time.monotonic()
+            if now < self.backoff_until:
+                continue
+            self._refill(now)
+            for key, job in self._due(now):
+                if self.tokens < 1 or time.monotonic() < self.backoff_until:
+                    break
+                if self.jobs.get(key) is not job:
+                    continue
+                try:
+                    await self._update(key, job, now)
+                except Exception:
+                    continue
+
+
+updater = MarkupUpdater()
+
+
+def stream_timer(chat_id: int) -> Render:
+    async def render():
+        if not await is_active_chat(chat_id):
+            return False
+        if not await is_music_playing(chat_id):
+            return
+        playing = db.get(chat_id)
+        if not playing or int(playing[0]["seconds"]) == 0:
+            return
+        mystic = playing[0].get("mystic")
+        if not mystic:
+            return
+        try:
+            language = await get_lang(chat_id)
+            _ = get_string(language)
+        except:
+            _ = get_string("en")
+        buttons = stream_markup_timer(
+            _,
+            chat_id,
+            seconds_to_min(get_played(playing[0])),
+            playing[0]["dur"],
+        )
+        return mystic, InlineKeyboardMarkup(buttons)
+
+    return render
@@ -1,16 +1,33 @@
+import asyncio
+import multiprocessing
 import os
 import re
-from collections import Counter
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
 
 import aiofiles
-import aiohttp
-from PIL import Image, ImageDraw, ImageEnhance, ImageFilter, ImageFont, ImageOps
-from youtubesearchpython.future import VideosSearch
-
+from cachetools import LRUCache
+
+import config
+import thumb_jobs
+from AnonXMusic.core.cache import MediaCache
+from AnonXMusic.core.httpclient import http_client
+from AnonXMusic.logging import LOGGER
+from AnonXMusic.utils.search import search_cache
+from AnonXMusic.utils.singleflight import SingleFlight
 from config import YOUTUBE_IMG_URL
 
-FONT_TITLE_PATH = "AnonXMusic/assets/font.ttf"
-FONT_INFO_PATH = "AnonXMusic/assets/font2.ttf"
+THUMB_FORMATS = {"jpeg": ("JPEG", "jpg"), "webp": ("WEBP", "webp")}
+THUMB_FORMAT, THUMB_EXT = THUMB_FORMATS.get(
+    config.THUMB_FORMAT.lower(), THUMB_FORMATS["jpeg"]
+)
+
+thumb_cache = MediaCache("thumbs", config.THUMB_CACHE_SIZE, "lru", "Thumbnail cache")
+# (dominant, accent) colours of the covers we've drawn.
+palettes = LRUCache(maxsize=4096)
+rendering = SingleFlight()
 
 def _extract_video_id_from_url(value: str) -> str:
     patterns = [
@@ -23,6 +40,17 @@ def _extract_video_id_from_url(value: str) -> str:
             return m.group(1)
     return value
 
+def _parse_result(result: dict, vid: str) -> dict:
+    title = result.get("title") or "Unknown Track"
+    return {
+        "title": re.sub(r"\W+", " ", title).title(),
+        "views": (result.get("viewCount") or {}).get("short") or "Views",
+        "channel": (result.get("channel") or {}).get("name") or "Unknown Channel",
+        "thumb": (result.get("thumbnails") or [{}])[0].get("url", "").split("?")[0]
+        or f"https://img.youtube.com/vi/{vid}/maxresdefault.jpg",
+    }
+
+
 def _normalize_video_input(value: str) -> tuple[str, str]:
     raw = value.strip()
     if "youtube.com" in raw or "youtu.be" in raw:
@@ -35,127 +63,157 @@ def _normalize_video_input(value: str) -> tuple[str, str]:
         url = f"https://www.youtube.com/watch?v={vid}"
     return url, vid
 
-class Thumbnail:
-    def __init__(self):
-        self.size = (1280, 720)
-        try:
-            self.font_title = ImageFont.truetype(FONT_TITLE_PATH, 48)
-            self.font_info = ImageFont.truetype(FONT_INFO_PATH, 35)
-        except Exception:
-            self.font_title = ImageFont.load_default()
-            self.font_info = ImageFont.load_default()
 
+class Thumbnail:
     async def save_thumb(self, output_path: str, url: str) -> str:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as resp:
-                if resp.status == 200:
-                    async with aiofiles.open(output_path, "wb") as f:
-                        await f.write(await resp.read())
+        resp = await http_client.get(url)
+        if resp.status_code == 200:
+            async with aiofiles.open(output_path, "wb") as f:
+                await f.write(resp.content)
         return output_path
 
-    def _truncate_text(self, draw, text, font, max_width):
-        try:
-            get_width = lambda t: draw.textlength(t, font=font)
-        except AttributeError:
-            get_width = lambda t: draw.textsize(t, font=font)[0]
-            
-        if get_width(text) <= max_width:
-            return text
-            
-        while text and get_width(text + "..") > max_width:
-            text = text[:-1]
-        return text + "."
-
-    def _get_dominant_colors(self, image):
-        img = image.copy().resize((50, 50)).convert("RGB")
-        return Counter(list(img.getdata())).most_common(1)[0][0]
+    async def _search(self, url: str, vid: str) -> dict:
+        # Usually a cache hit, the play flow looked this video up already.
+        result = await search_cache.first(url)
+        if result:
+            return _parse_result(result, vid)
+        return {
+            "title": "Unknown Track",
+            "views": "• Views",
+            "channel": "Youtube",
+            "thumb": f"https://img.youtube.com/vi/{vid}/maxresdefault.jpg",
+        }
+
+    async def _generate(self, url: str, vid: str) -> str:
+        os.makedirs("cache", exist_ok=True)
+        os.makedirs(thumb_cache.folder, exist_ok=True)
+        output = os.path.join(thumb_cache.folder, f"{vid}.{THUMB_EXT}")
+        temp = f"cache/temp_{vid}.jpg"
+
+        meta = await self._search(url, vid)
+        await self.save_thumb(temp, meta.get("thumb") or YOUTUBE_IMG_URL)
+
+        if not os.path.exists(temp):
+            return YOUTUBE_IMG_URL
 
-    async def generate(self, videoid: str) -> str:
         try:
-            os.makedirs("cache", exist_ok=True)
-            url, vid = _normalize_video_input(videoid)
-            output = f"cache/{vid}.png"
-            temp = f"cache/temp_{vid}.jpg"
-
-            if os.path.exists(output):
-                return output
-
-            results = VideosSearch(url, limit=1)
-            data = await results.next()
-            result_list = data.get("result") or []
-            
-            if result_list:
-                result = result_list[0]
-                title = result.get("title") or "Unknown Track"
-                title = re.sub(r"\W+", " ", title).title()
-                views = (result.get("viewCount") or {}).get("short") or "Views"
-                channel = (result.get("channel") or {}).get("name") or "Unknown Channel"
-                thumbnail_url = (result.get("thumbnails") or [{}])[0].get("url", "").split("?")[0]
-            else:
-                title = "Unknown Track"
-                views = "• Views"
-                channel = "Youtube"
-                thumbnail_url = f"https://img.youtube.com/vi/{vid}/maxresdefault.jpg"
-
-            if not thumbnail_url:
-                thumbnail_url = YOUTUBE_IMG_URL
-
-            await self.save_thumb(temp, thumbnail_url)
-            
-            if not os.path.exists(temp):
-                return YOUTUBE_IMG_URL
-
-            raw_cover = Image.open(temp).convert("RGBA")
-            
-            bg = ImageOps.fit(raw_cover, self.size, method=Image.Resampling.LANCZOS)
-            bg = bg.filter(ImageFilter.GaussianBlur(40))
-            bg = ImageEnhance.Brightness(bg).enhance(0.5)
-            bg = ImageEnhance.Contrast(bg).enhance(1.6)
-            bg = ImageEnhance.Color(bg).enhance(2.0)
-
-            portrait_size = (540, 500)
-            portrait = ImageOps.fit(raw_cover, portrait_size, method=Image.Resampling.LANCZOS)
-            portrait = ImageEnhance.Contrast(portrait).enhance(1.2)
-            portrait = ImageEnhance.Color(portrait).enhance(1.5)
-            
-            mask = Image.new("L", portrait_size, 0)
-            ImageDraw.Draw(mask).rounded_rectangle((0, 0, *portrait_size), 30, fill=255)
-            portrait.putalpha(mask)
-
-            px, py = (self.size[0] - portrait_size[0]) // 2, 70
-            bg.paste(portrait, (px, py), portrait)
-
-            draw = ImageDraw.Draw(bg)
-            
-            tx_top = py + portrait_size[1] + 30 
-            title_safe_w = portrait_size[0] + 120
-            info_safe_w = portrait_size[0] + 300 
-
-            title_text = self._truncate_text(draw, title.upper(), self.font_title, title_safe_w)
-            info = f"{channel}  •  {views}"
-            info_text = self._truncate_text(draw, info, self.font_info, info_safe_w)
-
-            draw.text((self.size[0] // 2, tx_top), title_text, font=self.font_title, fill=(255, 255, 255), anchor="ma")
-            draw.text((self.size[0] // 2, tx_top + 80), info_text, font=self.font_info, fill=(255, 255, 255, 210), anchor="ma")
-
-            dominant = self._get_dominant_colors(raw_cover)
-            bx, bt, bb = self.size[0] - 80, py + 20, py + portrait_size[1] - 20
-            draw.rounded_rectangle((bx - 5, bt, bx + 5, bb), 5, fill=(255, 255, 255, 40))
-            
-            prog_h = int((bb - bt) * 0.7)
-            draw.rounded_rectangle((bx - 5, bb - prog_h, bx + 5, bb), 5, fill=dominant)
-
-            bg.save(output, "PNG")
+            result = await renderer.render(
+                temp,
+                output,
+                meta["title"],
+                meta["views"],
+                meta["channel"],
+                palettes.get(vid),
+                THUMB_FORMAT,
+                config.THUMB_QUALITY,
+            )
+        finally:
             if os.path.exists(temp):
                 os.remove(temp)
-            return output
+        if result == YOUTUBE_IMG_URL:
+            return result
+        output, palettes[vid] = result
+        return thumb_cache.add(vid, "thumb", output)
 
+    async def generate(self, videoid: str) -> str:
+        try:
+            url, vid = _normalize_video_input(videoid)
+            cached = thumb_cache.get(vid, "thumb")
+            if cached:
+                return cached
+            return await rendering.do(vid, self._generate, url, vid)
         except Exception:
             return YOUTUBE_IMG_URL
 
+
+class ThumbRenderer:
+    """Runs the PIL part of thumbnails in a small process pool.
+
+    Workers come from a forkserver with only thumb_jobs loaded, like the
+    extraction workers, never from the bot itself."""
+
+    def __init__(self):
+        self.workers = max(1, config.THUMB_WORKERS)
+        self.max_pending = max(self.workers, config.THUMB_MAX_PENDING)
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.queued = 0
+        self.running = 0
+        self.rendered = 0
+        self.failed = 0
+        self.rejected = 0
+        self.last_ms = 0.0
+        self.avg_ms = 0.0
+        self.wait_ms = 0.0
+        self.semaphore = asyncio.Semaphore(self.workers)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        return self.executor
+
+    async def render(self, *args):
+        if self.queued + self.running >= self.max_pending:
+            self.rejected += 1
+            return YOUTUBE_IMG_URL
+        queued_at = time.perf_counter()
+        self.queued += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.queued -= 1
+        start = time.perf_counter()
+        self.wait_ms = (start - queued_at) * 1000
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._pool(), thumb_jobs.render, *args)
+        except BrokenProcessPool:
+            self.executor = None
+            self.failed += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.running -= 1
+            self.semaphore.release()
+        self.last_ms = (time.perf_counter() - start) * 1000
+        self.avg_ms = self.last_ms if not self.rendered else self.avg_ms * 0.9 + self.last_ms * 0.1
+        self.rendered += 1
+        if self.last_ms > 2000:
+            LOGGER(__name__).warning(
+                f"Slow thumbnail render: {self.last_ms:.0f}ms, {self.queued} waiting."
+            )
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued": self.queued,
+            "running": self.running,
+            "rendered": self.rendered,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "last_ms": round(self.last_ms, 1),
+            "avg_ms": round(self.avg_ms, 1),
+            "wait_ms": round(self.wait_ms, 1),
+        }
+
+
+thumbnail = Thumbnail()
+renderer = ThumbRenderer()
+
+
 async def get_thumb(videoid: str) -> str:
-    thumb = Thumbnail()
-    return await thumb.generate(videoid)
+    return await thumbnail.generate(videoid)
+
+def get_palette(videoid: str) -> Optional[tuple]:
+    _, vid = _normalize_video_input(videoid)
+    return palettes.get(vid)
+
 
 async def get_qthumb(videoid: str) -> str:
     try:
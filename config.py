@@ -1,5 +1,5 @@
 import re
-from os import getenv
+from os import environ, getenv
 
 from dotenv import load_dotenv
 from pyrogram import filters
@@ -50,21 +50,112 @@ AUTO_LEAVING_ASSISTANT = bool(getenv("AUTO_LEAVING_ASSISTANT", False))
 # Get this credentials from https://developer.spotify.com/dashboard
 SPOTIFY_CLIENT_ID = getenv("SPOTIFY_CLIENT_ID", "95f4f5c6df5744698035a0948e801ad9")
 SPOTIFY_CLIENT_SECRET = getenv("SPOTIFY_CLIENT_SECRET", "4b03167b38c943c3857333b3f5ea95ea")
+# How long (in seconds) spotify catalog responses are kept in memory
+SPOTIFY_CACHE_TTL = int(getenv("SPOTIFY_CACHE_TTL", 3600))
 
 # Maximum limit for fetching playlist's track from youtube, spotify, apple links.
 PLAYLIST_FETCH_LIMIT = int(getenv("PLAYLIST_FETCH_LIMIT", 500))
+# Playlist tracks looked up at once while a playlist is being queued
+PLAYLIST_CONCURRENCY = int(getenv("PLAYLIST_CONCURRENCY", 8))
+# yt-dlp extractions/downloads running at once, each one in its own worker process
+EXTRACT_WORKERS = int(getenv("EXTRACT_WORKERS", 4))
+# Seconds after which an extraction that didn't say otherwise is killed
+EXTRACT_TIMEOUT = int(getenv("EXTRACT_TIMEOUT", 300))
+# Seconds a yt-dlp download may take before it is killed, long videos on slow links need a while
+DOWNLOAD_TIMEOUT = int(getenv("DOWNLOAD_TIMEOUT", 3600))
+# yt-dlp video infos kept in memory, each one is reused until its stream urls expire
+INFO_CACHE_SIZE = int(getenv("INFO_CACHE_SIZE", 200))
 
 # Telegram audio and video file size limit (in bytes)
 TG_AUDIO_FILESIZE_LIMIT = int(getenv("TG_AUDIO_FILESIZE_LIMIT", 104857600))
 TG_VIDEO_FILESIZE_LIMIT = int(getenv("TG_VIDEO_FILESIZE_LIMIT", 1073741824))
 # Checkout https://www.gbmb.org/mb-to-bytes for converting mb to bytes
 
+# Maximum size of the downloads cache (in bytes), old files are evicted once it's full
+CACHE_SIZE_LIMIT = int(getenv("CACHE_SIZE_LIMIT", 5368709120))
+# Eviction policy for the downloads cache, "lru" (least recently used) or "lfu" (least frequently used)
+CACHE_EVICTION_POLICY = getenv("CACHE_EVICTION_POLICY", "lru")
+
+# Shared HTTP connection pool used by all platform fetchers (timeouts in seconds)
+HTTP_MAX_CONNECTIONS = int(getenv("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE = int(getenv("HTTP_MAX_KEEPALIVE", 50))
+HTTP_KEEPALIVE_EXPIRY = float(getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+HTTP_TIMEOUT = float(getenv("HTTP_TIMEOUT", 30))
+
+# Number of upcoming queued tracks to download in advance while one is playing (0 to disable)
+PREFETCH_TRACKS = int(getenv("PREFETCH_TRACKS", 2))
+# Maximum number of prefetch downloads running at once across all chats
+PREFETCH_CONCURRENCY = int(getenv("PREFETCH_CONCURRENCY", 3))
+# Maximum size of prefetched tracks waiting in queues (in bytes)
+PREFETCH_DISK_BUDGET = int(getenv("PREFETCH_DISK_BUDGET", 1073741824))
+
+# Interval (in seconds) for saving playback queues to the database so they survive restarts (0 to disable)
+QUEUE_SNAPSHOT_INTERVAL = int(getenv("QUEUE_SNAPSHOT_INTERVAL", 10))
+
+# Number of chats whose settings are kept in memory and for how long (in seconds)
+SETTINGS_CACHE_SIZE = int(getenv("SETTINGS_CACHE_SIZE", 10000))
+SETTINGS_CACHE_TTL = int(getenv("SETTINGS_CACHE_TTL", 3600))
+
+# How often (in seconds) on/off flags are re-read when mongo change streams aren't available
+FLAGS_POLL_INTERVAL = int(getenv("FLAGS_POLL_INTERVAL", 60))
+
+# Maximum inline keyboard edits per second across all chats for the live progress bars
+MARKUP_EDIT_RATE = float(getenv("MARKUP_EDIT_RATE", 20))
+# How often (in seconds) the progress bar under a playing track is refreshed
+MARKUP_UPDATE_INTERVAL = int(getenv("MARKUP_UPDATE_INTERVAL", 7))
+
+# Relative capacity of each assistant in session order, e.g. "2,1,1" (missing ones count as 1)
+ASSISTANT_CAPACITY = getenv("ASSISTANT_CAPACITY", "")
+# Failed joins in a row after which an assistant is skipped for new chats
+ASSISTANT_MAX_FAILURES = int(getenv("ASSISTANT_MAX_FAILURES", 3))
+# Seconds an unhealthy assistant is skipped before it gets another try
+ASSISTANT_COOLDOWN = int(getenv("ASSISTANT_COOLDOWN", 300))
+# Extra calls per unit of capacity an assistant may carry before idle chats are moved off it
+ASSISTANT_REBALANCE_MARGIN = float(getenv("ASSISTANT_REBALANCE_MARGIN", 1))
+
+# Plugin folders to load, e.g. "admins,bot,play" (leave empty to load all of them)
+PLUGIN_SETS = getenv("PLUGIN_SETS", "")
+# Plugins that are never loaded, e.g. "tools.speedtest,sudo.aeval"
+DISABLED_PLUGINS = getenv("DISABLED_PLUGINS", "")
+# Rarely used plugins that are only imported once one of their commands is used
+LAZY_PLUGINS = getenv("LAZY_PLUGINS", "sudo.aeval,tools.history,tools.speedtest")
+
+# Processes used to draw thumbnails
+THUMB_WORKERS = int(getenv("THUMB_WORKERS", 2))
+# Thumbnails allowed to wait for a worker before falling back to the default image
+THUMB_MAX_PENDING = int(getenv("THUMB_MAX_PENDING", 16))
+# Disk space (in bytes) kept for rendered thumbnails, least recently used ones go first
+THUMB_CACHE_SIZE = int(getenv("THUMB_CACHE_SIZE", 268435456))
+# Thumbnail file format, "jpeg" or "webp"
+THUMB_FORMAT = getenv("THUMB_FORMAT", "jpeg")
+THUMB_QUALITY = int(getenv("THUMB_QUALITY", 85))
+
+# YouTube searches kept in memory and for how long (in seconds)
+SEARCH_CACHE_SIZE = int(getenv("SEARCH_CACHE_SIZE", 5000))
+SEARCH_CACHE_TTL = int(getenv("SEARCH_CACHE_TTL", 1800))
+# How long (in seconds) a search that found nothing is remembered
+SEARCH_NEGATIVE_TTL = int(getenv("SEARCH_NEGATIVE_TTL", 120))
+# Seconds to wait for a YouTube search
+SEARCH_TIMEOUT = int(getenv("SEARCH_TIMEOUT", 30))
+# Spotify/Apple/Resso tracks matched to YouTube videos kept in memory (all of them are kept in mongo)
+TRACK_MATCH_CACHE_SIZE = int(getenv("TRACK_MATCH_CACHE_SIZE", 20000))
+# How long (in seconds) Telegram may cache inline search results
+INLINE_CACHE_TIME = int(getenv("INLINE_CACHE_TIME", 300))
+# Milliseconds to wait for the user to stop typing before an inline search
+INLINE_DEBOUNCE = int(getenv("INLINE_DEBOUNCE", 350))
+
 # Get your pyrogram v2 session from @StringFatherBot on Telegram
-STRING1 = getenv("STRING_SESSION", None)
-STRING2 = getenv("STRING_SESSION2", None)
-STRING3 = getenv("STRING_SESSION3", None)
-STRING4 = getenv("STRING_SESSION4", None)
-STRING5 = getenv("STRING_SESSION5", None)
+# Add as many assistants as you like: STRING_SESSION, STRING_SESSION2, STRING_SESSION3, ...
+# STRING_SESSION is assistant 1, so it can't be used together with STRING_SESSION1.
+if getenv("STRING_SESSION") and getenv("STRING_SESSION1"):
+    raise SystemExit(
+        "[ERROR] - STRING_SESSION and STRING_SESSION1 are both assistant 1, set only one of them."
+    )
+STRING_SESSIONS = {
+    int(key[len("STRING_SESSION") :] or 1): value
+    for key, value in environ.items()
+    if re.fullmatch(r"STRING_SESSION\d*", key) and value
+}
 
 BANNED_USERS = filters.user()
 adminlist = {}
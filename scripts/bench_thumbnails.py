@@ -0,0 +1,74 @@
+"""Renders/sec of the thumbnail engine, cold (like the old per-call Thumbnail) vs warm.
+
+    python scripts/bench_thumbnails.py [cover.jpg] [-n 20]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+# Import the renderer without running AnonXMusic/__init__ (which logs the
+# clients in and touches the database).
+for name in ("AnonXMusic", "AnonXMusic.utils"):
+    package = types.ModuleType(name)
+    package.__path__ = [os.path.join(ROOT, *name.split("."))]
+    sys.modules[name] = package
+
+from PIL import Image  # noqa: E402
+
+from AnonXMusic.utils import thumbnails  # noqa: E402
+
+TITLE = "Some Fairly Long Track Title Official Music Video Remastered 2024"
+VIEWS = "12M views"
+CHANNEL = "Some Channel VEVO"
+
+
+def make_cover(path: str):
+    cover = Image.radial_gradient("L").resize((1280, 720)).convert("RGB")
+    cover.save(path, "JPEG")
+
+
+def bench(label: str, render, runs: int) -> float:
+    render()
+    start = time.perf_counter()
+    for _ in range(runs):
+        render()
+    took = time.perf_counter() - start
+    print(f"{label:>6}: {runs / took:6.2f} renders/sec ({took / runs * 1000:.1f} ms each)")
+    return runs / took
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("cover", nargs="?")
+    parser.add_argument("-n", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cover = args.cover or os.path.join(tmp, "cover.jpg")
+        if not args.cover:
+            make_cover(cover)
+        output = os.path.join(tmp, f"out.{thumbnails.THUMB_EXT}")
+        job = (cover, output, TITLE, VIEWS, CHANNEL)
+
+        def cold():
+            thumbnails._font.cache_clear()
+            thumbnails.Thumbnail().render(*job)
+
+        def warm():
+            thumbnails.thumbnail.render(*job)
+
+        before = bench("cold", cold, args.n)
+        after = bench("warm", warm, args.n)
+        print(f"speedup: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,142 @@
+import logging
 import os
-from typing import List
+import pickle
+from collections.abc import Mapping
+from string import Formatter
+from typing import Dict, Optional
 
 import yaml
 
+LANGS_DIR = r"./strings/langs/"
+COMPILED = os.path.join(LANGS_DIR, ".compiled.pickle")
+# Bump when the layout of the compiled file changes.
+VERSION = 2
+
 languages = {}
 languages_present = {}
 
+logger = logging.getLogger(__name__)
+
+
+class Catalog(Mapping):
+    """Strings of one language, missing keys are looked up in the fallback."""
+
+    __slots__ = ("name", "strings", "fallback")
+
+    def __init__(self, name: str, strings: dict, fallback: Optional["Catalog"] = None):
+        self.name = name
+        self.strings = strings
+        self.fallback = fallback
+
+    def __getitem__(self, key):
+        try:
+            return self.strings[key]
+        except KeyError:
+            if self.fallback is None:
+                raise
+            return self.fallback[key]
+
+    def __contains__(self, key):
+        return key in self.strings or (
+            self.fallback is not None and key in self.fallback
+        )
+
+    def __iter__(self):
+        yield from self.strings
+        if self.fallback is not None:
+            yield from (k for k in self.fallback if k not in self.strings)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
 
 def get_string(lang: str):
     return languages[lang]
 
 
-for filename in os.listdir(r"./strings/langs/"):
-    if "en" not in languages:
-        languages["en"] = yaml.safe_load(
-            open(r"./strings/langs/en.yml", encoding="utf8")
+def _fields(template) -> Optional[frozenset]:
+    if not isinstance(template, str):
+        return frozenset()
+    try:
+        return frozenset(
+            field for _, field, _, _ in Formatter().parse(template) if field is not None
         )
-        languages_present["en"] = languages["en"]["name"]
-    if filename.endswith(".yml"):
-        language_name = filename[:-4]
-        if language_name == "en":
+    except ValueError:
+        return None
+
+
+def _compile(path: str, base: Optional[dict] = None) -> dict:
+    with open(path, encoding="utf8") as f:
+        strings = yaml.safe_load(f) or {}
+    if base is None:
+        return strings
+    # Call sites may pass more args than english uses, so a differing set of
+    # placeholders isn't necessarily wrong. Only named ones english doesn't
+    # know about are worth a look.
+    for key in strings:
+        if key not in base:
             continue
-        languages[language_name] = yaml.safe_load(
-            open(r"./strings/langs/" + filename, encoding="utf8")
-        )
-        for item in languages["en"]:
-            if item not in languages[language_name]:
-                languages[language_name][item] = languages["en"][item]
+        fields = _fields(strings[key])
+        if fields is None:
+            logger.warning(f"{path}: {key} is not a valid format string.")
+            continue
+        named = {x for x in fields if x and not x.isdigit()}
+        unknown = named - (_fields(base[key]) or frozenset())
+        if unknown:
+            logger.warning(f"{path}: {key} uses unknown placeholders {sorted(unknown)}.")
+    return strings
+
+
+def _stamp(path: str) -> tuple:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _load_compiled() -> dict:
     try:
-        languages_present[language_name] = languages[language_name]["name"]
-    except:
-        print("There is some issue with the language file inside bot.")
-        exit()
+        with open(COMPILED, "rb") as f:
+            compiled = pickle.load(f)
+        if compiled.get("version") == VERSION:
+            return compiled["langs"]
+    except Exception:
+        pass
+    return {}
+
+
+def load_languages():
+    files = sorted(x[:-4] for x in os.listdir(LANGS_DIR) if x.endswith(".yml"))
+    cached = _load_compiled()
+    compiled: Dict[str, tuple] = {}
+    en_stamp = _stamp(os.path.join(LANGS_DIR, "en.yml"))
+    changed = False
+    for name in ["en"] + [x for x in files if x != "en"]:
+        path = os.path.join(LANGS_DIR, name + ".yml")
+        # Translations are checked against english, so they depend on it too.
+        key = (_stamp(path), en_stamp)
+        if name in cached and cached[name][0] == key:
+            compiled[name] = cached[name]
+            continue
+        base = None if name == "en" else compiled["en"][1]
+        compiled[name] = (key, _compile(path, base))
+        changed = True
+    if changed or set(compiled) != set(cached):
+        try:
+            with open(COMPILED, "wb") as f:
+                pickle.dump({"version": VERSION, "langs": compiled}, f)
+        except OSError:
+            pass
+
+    languages.clear()
+    languages_present.clear()
+    languages["en"] = Catalog("en", compiled["en"][1])
+    for name, (_, strings) in compiled.items():
+        if name != "en":
+            languages[name] = Catalog(name, strings, languages["en"])
+        try:
+            languages_present[name] = languages[name]["name"]
+        except:
+            print("There is some issue with the language file inside bot.")
+            exit()
+
+
+load_languages()
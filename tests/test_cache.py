@@ -0,0 +1,46 @@
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def cache_module(monkeypatch, tmp_path):
+    # Importing AnonXMusic itself starts the clients, load the cache on its own.
+    package = types.ModuleType("AnonXMusic")
+    package.__path__ = [os.path.join(ROOT, "AnonXMusic")]
+    misc = types.ModuleType("AnonXMusic.misc")
+    misc.db = {}
+    monkeypatch.syspath_prepend(ROOT)
+    monkeypatch.chdir(tmp_path)
+    # config needs it, any chat id will do here.
+    monkeypatch.setenv("LOGGER_ID", os.environ.get("LOGGER_ID", "0"))
+    monkeypatch.setitem(sys.modules, "AnonXMusic", package)
+    monkeypatch.setitem(sys.modules, "AnonXMusic.misc", misc)
+    monkeypatch.delitem(sys.modules, "AnonXMusic.core.cache", raising=False)
+    module = importlib.import_module("AnonXMusic.core.cache")
+    yield module, misc.db
+    for name in [x for x in sys.modules if x.startswith("AnonXMusic.")]:
+        monkeypatch.delitem(sys.modules, name, raising=False)
+
+
+def test_sweep_keeps_restored_absolute_queue_files(cache_module):
+    cache, db = cache_module
+    os.makedirs("downloads")
+    queued = os.path.join(os.path.realpath("downloads"), "telegram.ogg")
+    stale = os.path.join("downloads", "partial.m4a")
+    for path in (queued, stale):
+        with open(path, "wb") as f:
+            f.write(b"x")
+    db[-100] = [{"file": queued, "vidid": "telegram"}]
+
+    media = cache.MediaCache(folder="downloads", limit=0)
+    media.load(sweep=False)
+    media.sweep()
+
+    assert os.path.exists(queued)
+    assert not os.path.exists(stale)
@@ -0,0 +1,158 @@
+"""Thumbnail drawing run by AnonXMusic.utils.thumbnails' worker processes.
+
+Kept outside the AnonXMusic package for the same reason as ytdlp_jobs:
+importing anything inside it would start the bot's clients in every worker.
+Everything a render needs is passed in.
+"""
+
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+from cachetools import LRUCache
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter, ImageFont, ImageOps
+
+FONT_TITLE_PATH = "AnonXMusic/assets/font.ttf"
+FONT_INFO_PATH = "AnonXMusic/assets/font2.ttf"
+
+
+@lru_cache(maxsize=None)
+def _font(path: str, size: int):
+    try:
+        return ImageFont.truetype(path, size)
+    except Exception:
+        return ImageFont.load_default()
+
+
+class Layout:
+    size = (1280, 720)
+    portrait_size = (540, 500)
+    portrait_pos = ((1280 - 540) // 2, 70)
+
+    def __init__(self):
+        self.font_title = _font(FONT_TITLE_PATH, 48)
+        self.font_info = _font(FONT_INFO_PATH, 35)
+        self._widths = LRUCache(maxsize=4096)
+
+        # Everything below looks the same on every thumbnail, build it once.
+        self.mask = Image.new("L", self.portrait_size, 0)
+        ImageDraw.Draw(self.mask).rounded_rectangle(
+            (0, 0, *self.portrait_size), 30, fill=255
+        )
+        px, py = self.portrait_pos
+        self.bar = (self.size[0] - 80, py + 20, py + self.portrait_size[1] - 20)
+        bx, bt, bb = self.bar
+        self.track = Image.new("RGBA", self.size, (0, 0, 0, 0))
+        ImageDraw.Draw(self.track).rounded_rectangle(
+            (bx - 5, bt, bx + 5, bb), 5, fill=(255, 255, 255, 40)
+        )
+        self._measure = ImageDraw.Draw(Image.new("L", (1, 1)))
+
+    def _text_width(self, text: str, font) -> float:
+        key = (text, id(font))
+        width = self._widths.get(key)
+        if width is None:
+            try:
+                width = self._measure.textlength(text, font=font)
+            except AttributeError:
+                width = self._measure.textsize(text, font=font)[0]
+            self._widths[key] = width
+        return width
+
+    def _truncate_text(self, text, font, max_width):
+        if self._text_width(text, font) <= max_width:
+            return text
+        # Longest prefix that still fits next to the dots.
+        lo, hi = 0, len(text)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self._text_width(text[:mid] + "..", font) <= max_width:
+                lo = mid
+            else:
+                hi = mid - 1
+        return text[:lo] + "."
+
+    @staticmethod
+    def _get_palette(image) -> tuple:
+        pixels = np.asarray(image.convert("RGB").resize((64, 64)), dtype=np.uint8)
+        pixels = pixels.reshape(-1, 3)
+        # 4 bits per channel, 4096 bins.
+        bins = (pixels >> 4).astype(np.uint16)
+        index = (bins[:, 0] << 8) | (bins[:, 1] << 4) | bins[:, 2]
+        counts = np.bincount(index, minlength=4096)
+        order = np.argsort(counts)[::-1]
+
+        def colour(b):
+            return tuple(int(x) for x in pixels[index == b].mean(axis=0))
+
+        dominant = colour(order[0])
+        accent = dominant
+        for b in order[1:16]:
+            if not counts[b]:
+                break
+            candidate = colour(b)
+            if sum(abs(x - y) for x, y in zip(candidate, dominant)) > 96:
+                accent = candidate
+                break
+        return dominant, accent
+
+    def render(
+        self,
+        cover_path: str,
+        output: str,
+        title: str,
+        views: str,
+        channel: str,
+        palette: Optional[tuple],
+        format: str,
+        quality: int,
+    ) -> tuple:
+        raw_cover = Image.open(cover_path).convert("RGBA")
+
+        bg = ImageOps.fit(raw_cover, self.size, method=Image.Resampling.LANCZOS)
+        bg = bg.filter(ImageFilter.GaussianBlur(40))
+        bg = ImageEnhance.Brightness(bg).enhance(0.5)
+        bg = ImageEnhance.Contrast(bg).enhance(1.6)
+        bg = ImageEnhance.Color(bg).enhance(2.0)
+
+        portrait = ImageOps.fit(raw_cover, self.portrait_size, method=Image.Resampling.LANCZOS)
+        portrait = ImageEnhance.Contrast(portrait).enhance(1.2)
+        portrait = ImageEnhance.Color(portrait).enhance(1.5)
+        portrait.putalpha(self.mask)
+
+        px, py = self.portrait_pos
+        bg.paste(portrait, (px, py), portrait)
+        bg.alpha_composite(self.track)
+
+        draw = ImageDraw.Draw(bg)
+
+        tx_top = py + self.portrait_size[1] + 30
+        title_safe_w = self.portrait_size[0] + 120
+        info_safe_w = self.portrait_size[0] + 300
+
+        title_text = self._truncate_text(title.upper(), self.font_title, title_safe_w)
+        info = f"{channel}  •  {views}"
+        info_text = self._truncate_text(info, self.font_info, info_safe_w)
+
+        draw.text((self.size[0] // 2, tx_top), title_text, font=self.font_title, fill=(255, 255, 255), anchor="ma")
+        draw.text((self.size[0] // 2, tx_top + 80), info_text, font=self.font_info, fill=(255, 255, 255, 210), anchor="ma")
+
+        palette = palette or self._get_palette(raw_cover)
+        dominant = palette[0]
+        bx, bt, bb = self.bar
+        prog_h = int((bb - bt) * 0.7)
+        draw.rounded_rectangle((bx - 5, bb - prog_h, bx + 5, bb), 5, fill=dominant)
+
+        bg.convert("RGB").save(output, format, quality=quality)
+        return output, palette
+
+
+_layout: Optional[Layout] = None
+
+
+def render(*args) -> tuple:
+    # Built once per worker, the fonts and layers are reused by every render.
+    global _layout
+    if _layout is None:
+        _layout = Layout()
+    return _layout.render(*args)
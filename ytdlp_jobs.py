@@ -0,0 +1,94 @@
+"""yt-dlp jobs run by AnonXMusic.core.extractor's worker processes.
+
+Kept outside the AnonXMusic package on purpose: workers import this module
+by name, and importing anything inside the package would start the bot's
+clients in every worker. Everything a job needs is passed in.
+"""
+
+import copy
+import os
+from typing import Optional
+
+from yt_dlp import YoutubeDL
+
+# Big, and not needed to download or stream a video.
+INFO_DROP_KEYS = ("automatic_captions", "subtitles", "heatmap")
+
+
+def run_job(conn, func, args: tuple):
+    try:
+        result = (True, func(*args))
+    except BaseException as e:
+        result = (False, f"{type(e).__name__}: {e}")
+    try:
+        conn.send(result)
+    except Exception as e:
+        conn.send((False, f"Unpicklable result: {e}"))
+    finally:
+        conn.close()
+
+
+def _exists(path: str) -> Optional[str]:
+    return path if os.path.exists(path) and os.path.getsize(path) > 0 else None
+
+
+def flat_playlist(link: str, limit: int, cookiefile: str) -> list:
+    opts = {
+        "quiet": True,
+        "no_warnings": True,
+        "extract_flat": True,
+        "skip_download": True,
+        "cookiefile": cookiefile,
+    }
+    with YoutubeDL(opts) as ydl:
+        info = ydl.extract_info(link, download=False)
+    if not info:
+        return []
+    return [
+        entry
+        for entry in (info.get("entries", []) or [])[:limit]
+        if entry and entry.get("id")
+    ]
+
+
+def extract_info(link: str, cookiefile: str, headers: dict) -> dict:
+    """Unprocessed info, formats are picked from it later with process_ie_result."""
+    opts = {
+        "quiet": True,
+        "no_warnings": True,
+        "cookiefile": cookiefile,
+        "http_headers": headers,
+    }
+    with YoutubeDL(opts) as ydl:
+        info = ydl.extract_info(link, download=False, process=False)
+        info = ydl.sanitize_info(info, remove_private_keys=True)
+    for key in INFO_DROP_KEYS:
+        info.pop(key, None)
+    return info
+
+
+def direct_url(info: dict, format: str) -> Optional[str]:
+    opts = {"format": format, "quiet": True, "no_warnings": True}
+    with YoutubeDL(opts) as ydl:
+        info = ydl.process_ie_result(copy.deepcopy(info), download=False)
+    return (info or {}).get("url")
+
+
+def download(info: dict, opts: dict, path: Optional[str] = None) -> Optional[str]:
+    """Downloads the formats opts select from info, path defaults to downloads/<id>.<ext>."""
+    with YoutubeDL(opts) as ydl:
+        if path is None:
+            selected = ydl.process_ie_result(copy.deepcopy(info), download=False)
+            if not selected:
+                return None
+            path = os.path.join("downloads", f"{selected['id']}.{selected['ext']}")
+        if _exists(path):
+            return path
+        ydl.process_ie_result(copy.deepcopy(info), download=True)
+    return _exists(path)
+
+
+def soundcloud(url: str, opts: dict) -> dict:
+    with YoutubeDL(opts) as ydl:
+        info = ydl.extract_info(url)
+    return {k: info.get(k) for k in ("id", "ext", "title", "duration", "uploader")}